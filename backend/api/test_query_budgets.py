@@ -0,0 +1,97 @@
+"""
+Query budgets for the list endpoints.
+
+Each endpoint is requested with a small and a larger dataset: the number of
+SQL queries must stay within its budget and must not grow with the number of
+rows (which would reveal an N+1 pattern).
+"""
+
+import datetime
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import Point
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from observations.models import Observation
+from species.models import CuratedObservation
+
+User = get_user_model()
+
+pytestmark = pytest.mark.django_db
+
+# (url, maximum number of SQL queries)
+QUERY_BUDGETS = [
+    # dataset version (2) + one query per observation source
+    ("/api/v1/map/observations/", 4),
+    ("/api/v1/map/observations/?stream=1", 4),
+    # dataset version + page count + page
+    ("/api/v1/observations/", 3),
+    ("/api/v1/observations/curated/", 2),
+    ("/api/v1/species/curated/", 2),
+    ("/api/v1/auth/profiles/me/", 2),
+]
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(
+        email="budget@example.com", username="budget", password="Budget$123"
+    )
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def seed(user, count):
+    """Adds `count` rows of each kind of observation."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    start = CuratedObservation.objects.count()
+    for i in range(start, start + count):
+        Observation.objects.create(
+            user=user,
+            species_name=f"Species {i}",
+            location=Point(i % 180, i % 90),
+            observation_datetime=now,
+            location_name="Reef",
+            source="obis" if i % 2 else "user",
+        )
+        CuratedObservation.objects.create(
+            obis_id=f"budget-{i}",
+            species_name=f"Species {i}",
+            location=Point(i % 180, i % 90),
+            observation_datetime=now,
+        )
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+        assert response.status_code == 200
+        if response.streaming:
+            b"".join(response.streaming_content)
+    return len(context.captured_queries)
+
+
+def assert_query_budget(client, user, url, budget):
+    """
+    Fails if `url` runs more than `budget` queries, or if its query count
+    grows with the number of rows returned.
+    """
+    seed(user, 1)
+    few = count_queries(client, url)
+    seed(user, 9)
+    many = count_queries(client, url)
+    assert many <= budget, f"{url} ran {many} queries (budget {budget})"
+    assert many == few, f"{url} ran {few} then {many} queries (N+1?)"
+
+
+@pytest.mark.parametrize("url,budget", QUERY_BUDGETS)
+def test_list_endpoint_query_budget(client, user, url, budget):
+    assert_query_budget(client, user, url, budget)
@@ -0,0 +1,54 @@
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def queryset_version(queryset):
+    """
+    Cheap version of a TimeStampedModel queryset: its latest `updated_at`
+    and its row count (so deletions change the version too).
+    """
+    version = queryset.order_by().aggregate(
+        last_updated=Max("updated_at"), count=Count("pk")
+    )
+    return version["last_updated"], version["count"]
+
+
+def make_etag(*parts):
+    """Strong ETag derived from the given version parts."""
+    digest = hashlib.sha1(
+        "|".join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return quote_etag(digest)
+
+
+def latest(*datetimes):
+    """Most recent of the given datetimes, ignoring None."""
+    return max((dt for dt in datetimes if dt is not None), default=None)
+
+
+def not_modified_response(request, etag, last_modified):
+    """
+    Returns a 304 Not Modified response if the client's cached copy (sent
+    with If-None-Match / If-Modified-Since) is current, otherwise None.
+    """
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=(
+            timegm(last_modified.utctimetuple()) if last_modified else None
+        ),
+    )
+
+
+def set_validators(response, etag, last_modified):
+    """Adds the ETag and Last-Modified headers to a response."""
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(
+            timegm(last_modified.utctimetuple())
+        )
+    return response
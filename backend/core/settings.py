@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     "observations",
     "users",
     "species",
+    "map",
 ]
 
 # =============================================================================
@@ -122,6 +123,30 @@ USE_TZ = True
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# =============================================================================
+# Cache
+# =============================================================================
+# "map" caches map_observations responses: a bounded in-process LRU by
+# default, any Django cache backend (e.g. Redis) can be plugged in via env.
+MAP_CACHE_ALIAS = "map"
+MAP_CACHE_BACKEND = os.getenv(
+    "MAP_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    MAP_CACHE_ALIAS: {
+        "BACKEND": MAP_CACHE_BACKEND,
+        "LOCATION": os.getenv("MAP_CACHE_LOCATION", "map-responses"),
+        "TIMEOUT": int(os.getenv("MAP_CACHE_TIMEOUT", 300)),
+    },
+}
+if MAP_CACHE_BACKEND.endswith("LocMemCache"):
+    CACHES[MAP_CACHE_ALIAS]["OPTIONS"] = {
+        "MAX_ENTRIES": int(os.getenv("MAP_CACHE_MAX_ENTRIES", 100)),
+    }
+
 # =============================================================================
 # Static/Media
 # =============================================================================
@@ -259,7 +284,56 @@ OBIS_DEFAULT_GEOMETRY = os.environ.get(
     "POLYGON((-180 -90, 180 -90, 180 90, -180 90, -180 -90))",
 )
 OBIS_DEFAULT_FETCH_PAGES = int(os.environ.get("OBIS_DEFAULT_FETCH_PAGES", 1))
+# Rows per multi-row INSERT when the ETL writes a page of curated observations
+OBIS_BULK_BATCH_SIZE = int(os.environ.get("OBIS_BULK_BATCH_SIZE", 500))
+# Above this many records, refreshes page with the OBIS `after` cursor
+OBIS_OFFSET_PAGING_LIMIT = int(
+    os.environ.get("OBIS_OFFSET_PAGING_LIMIT", 10000)
+)
+# Refresh geometries over this many records are split into tiles, down to
+# tiles of OBIS_SHARD_MIN_SIZE degrees
+OBIS_SHARD_THRESHOLD = int(os.environ.get("OBIS_SHARD_THRESHOLD", 10000))
+OBIS_SHARD_MIN_SIZE = float(os.environ.get("OBIS_SHARD_MIN_SIZE", 0.5))
+# Pages fetched in parallel by a refresh, and max OBIS API requests per second
+OBIS_FETCH_CONCURRENCY = int(os.environ.get("OBIS_FETCH_CONCURRENCY", 4))
+OBIS_API_RATE_LIMIT = float(os.environ.get("OBIS_API_RATE_LIMIT", 2))
+# Transformed pages waiting to be written by a refresh (pipeline backpressure)
+OBIS_PIPELINE_QUEUE_SIZE = int(os.environ.get("OBIS_PIPELINE_QUEUE_SIZE", 2))
 
 WORMS_API_BASE_URL = os.environ.get(
     "WORMS_API_BASE_URL", "https://www.marinespecies.org/rest/"
 )
+# WoRMS common names cache: in-process LRU size, and lifetime of an entry
+WORMS_CACHE_SIZE = int(os.environ.get("WORMS_CACHE_SIZE", 10000))
+WORMS_CACHE_TTL_DAYS = int(os.environ.get("WORMS_CACHE_TTL_DAYS", 30))
+# Parallel WoRMS requests when the ETL resolves the AphiaIDs of a page
+WORMS_LOOKUP_CONCURRENCY = int(os.environ.get("WORMS_LOOKUP_CONCURRENCY", 8))
+# Retries of OBIS/WoRMS requests on 429/5xx, with exponential backoff (seconds)
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", 0.5))
+
+# =============================================================================
+# Map API (used in map.views)
+# =============================================================================
+# Below this zoom level, ?cluster=1 requests are answered with grid clusters
+MAP_CLUSTER_MAX_ZOOM = int(os.environ.get("MAP_CLUSTER_MAX_ZOOM", 12))
+# Size of a cluster grid cell, in screen pixels of a 256px web map tile
+MAP_CLUSTER_GRID_PX = int(os.environ.get("MAP_CLUSTER_GRID_PX", 64))
+# From this zoom level on, vector tiles carry the full popup property set
+MAP_TILE_DETAIL_ZOOM = int(os.environ.get("MAP_TILE_DETAIL_ZOOM", 10))
+# Browser cache lifetime of vector tiles, in seconds
+MAP_TILE_MAX_AGE = int(os.environ.get("MAP_TILE_MAX_AGE", 300))
+# Rows fetched per server-side cursor round-trip when streaming map features
+MAP_STREAM_CHUNK_SIZE = int(os.environ.get("MAP_STREAM_CHUNK_SIZE", 2000))
+# Decimals kept on map query coordinates, so nearby requests share a cache entry
+MAP_CACHE_COORD_DECIMALS = int(os.environ.get("MAP_CACHE_COORD_DECIMALS", 3))
+# Hard cap on individual features returned by map_observations
+MAP_MAX_FEATURES = int(os.environ.get("MAP_MAX_FEATURES", 5000))
+# Max ids per request on the map feature details endpoint (thin mode)
+MAP_MAX_DETAIL_IDS = int(os.environ.get("MAP_MAX_DETAIL_IDS", 200))
+# Density grid: default cells across the bbox, and max cells per request
+MAP_DENSITY_GRID_CELLS = int(os.environ.get("MAP_DENSITY_GRID_CELLS", 64))
+MAP_DENSITY_MAX_CELLS = int(os.environ.get("MAP_DENSITY_MAX_CELLS", 10000))
+# Default and max number of sightings returned by the nearest endpoint
+MAP_NEAREST_DEFAULT_K = int(os.environ.get("MAP_NEAREST_DEFAULT_K", 20))
+MAP_NEAREST_MAX_K = int(os.environ.get("MAP_NEAREST_MAX_K", 200))
@@ -0,0 +1,94 @@
+# backend/map/cache.py
+
+import hashlib
+import math
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Query parameters that change the map response; anything else (e.g. cache
+# busters added by the client) is ignored so it doesn't split the cache.
+MAP_QUERY_PARAMS = (
+    "lat",
+    "lng",
+    "radius",
+    "bbox",
+    "cluster",
+    "z",
+    "stream",
+    "limit",
+    "thin",
+)
+
+GENERATION_KEY = "map:generation"
+
+
+def map_cache():
+    return caches[settings.MAP_CACHE_ALIAS]
+
+
+def _round(value, decimals, rounding=round):
+    factor = 10**decimals
+    return rounding(float(value) * factor) / factor
+
+
+def normalize_map_params(query_params):
+    """
+    Canonical form of the map query parameters: coordinates are rounded to
+    MAP_CACHE_COORD_DECIMALS (bbox edges outwards) and the radius to 0.1 km,
+    so that nearby requests share cache entries. The view queries with these
+    same rounded values. Malformed values are kept as-is for the view to
+    reject.
+    """
+    decimals = settings.MAP_CACHE_COORD_DECIMALS
+    params = {}
+    for name in MAP_QUERY_PARAMS:
+        value = query_params.get(name)
+        if value is None:
+            continue
+        try:
+            if name in ("lat", "lng"):
+                value = str(_round(value, decimals))
+            elif name == "radius":
+                value = str(_round(value, 1))
+            elif name == "bbox":
+                min_lon, min_lat, max_lon, max_lat = value.split(",")
+                value = ",".join(
+                    str(coord)
+                    for coord in (
+                        _round(min_lon, decimals, math.floor),
+                        _round(min_lat, decimals, math.floor),
+                        _round(max_lon, decimals, math.ceil),
+                        _round(max_lat, decimals, math.ceil),
+                    )
+                )
+        except (TypeError, ValueError, OverflowError):
+            pass
+        params[name] = value
+    return params
+
+
+def map_cache_key(etag, params):
+    """
+    Cache key of a map response. It includes the dataset version (ETag), so
+    entries cached by other processes never outlive a data change, and a
+    generation counter bumped by invalidate_map_cache().
+    """
+    generation = map_cache().get_or_set(GENERATION_KEY, 1, timeout=None)
+    query = "&".join(
+        f"{name}={value}" for name, value in sorted(params.items())
+    )
+    digest = hashlib.sha1(f"{etag}|{query}".encode()).hexdigest()
+    return f"map:{generation}:{digest}"
+
+
+def invalidate_map_cache(**kwargs):
+    """
+    Drops every cached map response (signal receiver). Bumping the
+    generation makes all existing keys unreachable; the backend evicts them.
+    """
+    cache = map_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
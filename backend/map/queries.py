@@ -0,0 +1,298 @@
+# backend/map/queries.py
+
+from django.contrib.auth import get_user_model
+from django.contrib.gis.db.models import PointField
+from django.contrib.gis.geos import MultiPolygon
+from django.db import connection
+from django.db.models import F, FloatField, Func, Q, Value
+from django.db.models.functions import Cast
+
+from observations.models import Observation
+from species.models import CuratedObservation
+
+CLUSTER_SQL = """
+    SELECT
+        cx,
+        cy,
+        COUNT(*) AS point_count,
+        AVG(lng) AS lng,
+        AVG(lat) AS lat,
+        MODE() WITHIN GROUP (ORDER BY species_name) AS top_species
+    FROM (
+        SELECT
+            ST_X(location::geometry) AS lng,
+            ST_Y(location::geometry) AS lat,
+            FLOOR(ST_X(location::geometry) / %s) AS cx,
+            FLOOR(ST_Y(location::geometry) / %s) AS cy,
+            species_name
+        FROM ({points}) AS points
+    ) AS cells
+    GROUP BY cx, cy
+    ORDER BY point_count DESC, cx, cy
+    LIMIT %s
+"""
+
+
+def planar_location():
+    """
+    `location` cast to a lon/lat geometry, as indexed on both observation
+    tables. Box tests on it are planar, like map viewports, whereas the
+    edges of a geography polygon are great-circle arcs: a world-wide box
+    would collapse onto the antimeridian.
+    """
+    return Cast("location", PointField(srid=4326))
+
+
+def filter_bbox(queryset, bbox):
+    """
+    Keeps the observations of `queryset` inside a bbox Polygon, or inside
+    either part of a MultiPolygon split at the antimeridian (see
+    map.views.parse_bbox). For points, && on a box is exact.
+    """
+    polygons = bbox if isinstance(bbox, MultiPolygon) else [bbox]
+    in_bbox = Q()
+    for polygon in polygons:
+        in_bbox |= Q(planar_location__bboverlaps=polygon)
+    return queryset.alias(planar_location=planar_location()).filter(in_bbox)
+
+
+def union_points(querysets, fields=("location", "species_name")):
+    """
+    Builds a UNION ALL of the given querysets (one per observation source),
+    selecting the same columns from each so they can be aggregated together
+    in a single SQL statement.
+    Returns a tuple (sql, params).
+    """
+    parts = []
+    params = []
+    for queryset in querysets:
+        sql, query_params = (
+            queryset.order_by()
+            .filter(location__isnull=False)
+            .values_list(*fields)
+            .query.sql_with_params()
+        )
+        parts.append(f"({sql})")
+        params.extend(query_params)
+    return " UNION ALL ".join(parts), params
+
+
+def cluster_points(querysets, cell_size, limit=None):
+    """
+    Groups the points of both observation sources into square grid cells of
+    `cell_size` degrees, computed in PostGIS.
+    :param limit: Maximum number of cells returned, the most populated
+                  first (default: all of them).
+    :return: List of dicts with cell indexes, point count, centroid and the
+             most frequent species of each cell.
+    """
+    points_sql, points_params = union_points(querysets)
+    sql = CLUSTER_SQL.format(points=points_sql)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [cell_size, cell_size, *points_params, limit])
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+DENSITY_SQL = """
+    SELECT
+        cells.i,
+        cells.j,
+        ST_AsGeoJSON(cells.geom, 6) AS geometry,
+        COUNT(*) AS point_count
+    FROM {grid}(%s, ST_MakeEnvelope(%s, %s, %s, %s, 4326)) AS cells
+    JOIN (
+        SELECT location::geometry AS geom FROM ({points}) AS points
+    ) AS points ON ST_Intersects(cells.geom, points.geom)
+    GROUP BY cells.i, cells.j, cells.geom
+"""
+
+DENSITY_GRIDS = {"hex": "ST_HexagonGrid", "square": "ST_SquareGrid"}
+
+
+def density_cells(querysets, extent, cell_size, shape="hex"):
+    """
+    Counts the points of both observation sources per cell of a hexagonal or
+    square grid covering `extent`, computed in PostGIS.
+    :param extent: (min_lon, min_lat, max_lon, max_lat) of the grid.
+    :param cell_size: Hexagon edge / square side, in degrees.
+    :param shape: "hex" or "square".
+    :return: List of dicts with the cell indexes, GeoJSON polygon and count.
+             Empty cells are left out.
+    """
+    points_sql, points_params = union_points(querysets, fields=("location",))
+    sql = DENSITY_SQL.format(grid=DENSITY_GRIDS[shape], points=points_sql)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [cell_size, *extent, *points_params])
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+class KnnDistance(Func):
+    """
+    `location <-> point`: distance (metres, on geography) that PostgreSQL can
+    sort by walking the GiST index (KNN), instead of computing it per row.
+    """
+
+    arg_joiner = " <-> "
+    template = "%(expressions)s"
+    output_field = FloatField()
+
+    def __init__(self, expression, point, **extra):
+        geography = Func(Value(point.ewkt), function="ST_GeogFromText")
+        super().__init__(expression, geography, **extra)
+
+
+def nearest_points(querysets, point, k):
+    """
+    The k points closest to `point` across several observation sources.
+    Each source is queried for its own k nearest rows (one index-ordered
+    query each) and the candidates are merged.
+    :param querysets: Dict of source name -> queryset.
+    :return: List of (source, pk, distance in metres), closest first.
+    """
+    candidates = []
+    for source, queryset in querysets.items():
+        rows = (
+            queryset.filter(location__isnull=False)
+            .annotate(distance=KnnDistance(F("location"), point))
+            .order_by("distance")
+            .values_list("pk", "distance")[:k]
+        )
+        candidates.extend((source, pk, distance) for pk, distance in rows)
+    return sorted(candidates, key=lambda candidate: candidate[2])[:k]
+
+
+def _iso_datetime(column):
+    return (
+        f"to_char({column} AT TIME ZONE 'UTC',"
+        ' \'YYYY-MM-DD"T"HH24:MI:SS"Z"\')'
+    )
+
+
+# (property, Observation expression, CuratedObservation expression, detail)
+# Properties flagged as detail are only included from MAP_TILE_DETAIL_ZOOM on,
+# mirroring MapObservationSerializer / MapCuratedObservationSerializer. The
+# image is left out: its URL comes from the storage backend (S3 in
+# production), so clients fetch it with the feature details (/map/features/).
+TILE_PROPERTIES = (
+    ("id", "'user-' || obs.id", "'obis-' || obs.id", False),
+    ("source", "'user'", "'obis'", False),
+    ("speciesName", "obs.species_name", "obs.species_name", False),
+    ("commonName", "obs.common_name", "obs.common_name", False),
+    (
+        "observationDatetime",
+        _iso_datetime("obs.observation_datetime"),
+        _iso_datetime("obs.observation_datetime"),
+        False,
+    ),
+    ("locationName", "obs.location_name", "obs.location_name", True),
+    ("depthMin", "obs.depth_min", "obs.depth_min", True),
+    ("depthMax", "obs.depth_max", "obs.depth_max", True),
+    ("bathymetry", "obs.bathymetry", "obs.bathymetry", True),
+    ("temperature", "obs.temperature", "obs.temperature", True),
+    ("visibility", "obs.visibility", "obs.visibility", True),
+    ("notes", "obs.notes", "obs.notes", True),
+    ("sex", "obs.sex", "obs.sex", True),
+    ("validated", "obs.validated", "obs.validated", True),
+    ("userId", "obs.user_id", "NULL::bigint", True),
+    ("username", "usr.username", 'obs."user"', True),
+    (
+        "createdAt",
+        _iso_datetime("obs.created_at"),
+        "NULL::text",
+        True,
+    ),
+    (
+        "updatedAt",
+        _iso_datetime("obs.updated_at"),
+        "NULL::text",
+        True,
+    ),
+)
+
+TILE_SQL = """
+    WITH bounds AS (
+        SELECT
+            ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom,
+            ST_Expand(
+                ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s), 4326),
+                %(margin)s
+            ) AS lonlat
+    ),
+    features AS (
+        {user_select}
+        UNION ALL
+        {curated_select}
+    )
+    SELECT ST_AsMVT(features.*, 'observations', %(extent)s, 'geom')
+    FROM features
+    WHERE features.geom IS NOT NULL
+"""
+
+TILE_SELECT_SQL = """
+        SELECT
+            ST_AsMVTGeom(
+                ST_Transform(obs.location::geometry, 3857),
+                bounds.geom,
+                %(extent)s,
+                %(buffer)s
+            ) AS geom,
+            {columns}
+        FROM {table} AS obs
+        {join}
+        CROSS JOIN bounds
+        WHERE obs.location::geometry(POINT,4326) && bounds.lonlat
+"""
+
+
+def _tile_select(table, columns, join=""):
+    return TILE_SELECT_SQL.format(
+        table=connection.ops.quote_name(table),
+        columns=",\n            ".join(columns),
+        join=join,
+    )
+
+
+def render_tile(z, x, y, detailed, extent=4096, buffer=64):
+    """
+    Renders the Mapbox Vector Tile z/x/y for both observation sources, in a
+    single "observations" layer, using ST_AsMVT.
+    :param detailed: Include the full property set (popup data) instead of
+                     the minimal one used to draw points.
+    :return: Tile bytes (empty if no observation falls in the tile).
+    """
+    properties = [prop for prop in TILE_PROPERTIES if detailed or not prop[3]]
+    user_columns = [f'{expr} AS "{name}"' for name, expr, _, _ in properties]
+    curated_columns = [
+        f'{expr} AS "{name}"' for name, _, expr, _ in properties
+    ]
+    join = ""
+    if detailed:
+        users_table = connection.ops.quote_name(
+            get_user_model()._meta.db_table
+        )
+        join = f"JOIN {users_table} AS usr ON usr.id = obs.user_id"
+
+    sql = TILE_SQL.format(
+        user_select=_tile_select(
+            Observation._meta.db_table, user_columns, join
+        ),
+        curated_select=_tile_select(
+            CuratedObservation._meta.db_table, curated_columns
+        ),
+    )
+    params = {
+        "z": z,
+        "x": x,
+        "y": y,
+        "extent": extent,
+        "buffer": buffer,
+        # The buffer, in degrees of longitude (tiles are never taller than
+        # wide in degrees, so it covers latitude too)
+        "margin": 360 / 2**z * buffer / extent,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] else b""
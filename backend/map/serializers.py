@@ -1,4 +1,5 @@
 # backend/map/serializers.py
+from django.db.models import FloatField, Func
 from observations.models import Observation
 from species.models import CuratedObservation
 from rest_framework import serializers
@@ -27,9 +28,8 @@ class ObservationGeoSerializer(GeoFeatureModelSerializer):
     notes = serializers.CharField(allow_null=True, required=False)
     image = serializers.ImageField(allow_null=True, required=False)
     sex = serializers.CharField(allow_null=True, required=False)
-    userId = serializers.PrimaryKeyRelatedField(
-        source="user.id", read_only=True
-    )
+    # Read the FK column directly, "user.id" would fetch the user per row
+    userId = serializers.IntegerField(source="user_id", read_only=True)
     createdAt = serializers.DateTimeField(source="created_at", read_only=True)
     updatedAt = serializers.DateTimeField(source="updated_at", read_only=True)
 
@@ -131,9 +131,10 @@ class MapCuratedObservationSerializer(GeoFeatureModelSerializer):
     notes = serializers.CharField(allow_null=True, required=False)
     image = serializers.URLField(allow_null=True, required=False)
     sex = serializers.CharField(allow_null=True, required=False)
+    # CuratedObservation.user is a plain CharField holding the name
     username = serializers.CharField(
-        source="user.username", read_only=True, allow_null=True
-    )  # ADD THIS LINE
+        source="user", read_only=True, allow_null=True
+    )
 
     class Meta:
         model = CuratedObservation
@@ -189,9 +190,8 @@ class MapObservationSerializer(GeoFeatureModelSerializer):
     notes = serializers.CharField(allow_null=True, required=False)
     image = serializers.ImageField(allow_null=True, required=False)
     sex = serializers.CharField(allow_null=True, required=False)
-    userId = serializers.PrimaryKeyRelatedField(
-        source="user.id", read_only=True
-    )
+    # Read the FK column directly, "user.id" would fetch the user per row
+    userId = serializers.IntegerField(source="user_id", read_only=True)
     username = serializers.CharField(
         source="user.username", read_only=True, allow_null=True
     )  # ADD THIS LINE
@@ -225,6 +225,11 @@ class MapObservationSerializer(GeoFeatureModelSerializer):
             "updatedAt",
         )
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Joins the user, read for "username", in the main query."""
+        return queryset.select_related("user")
+
     def get_source(self, obj):
         return "user"
 
@@ -232,5 +237,227 @@ class MapObservationSerializer(GeoFeatureModelSerializer):
         return f"user-{obj.id}"
 
 
-# Optionally, you could define your own MapObservationSerializer here later
-# For now, just use ObservationGeoSerializer for map results.
+# Fast path for the map: the functions below produce exactly the same feature
+# dicts as MapObservationSerializer / MapCuratedObservationSerializer, but read
+# plain tuples from .values_list() (coordinates extracted in SQL) instead of
+# running the DRF field machinery and GEOS -> GeoJSON conversion per row.
+
+
+class PointX(Func):
+    function = "ST_X"
+    template = "%(function)s(%(expressions)s::geometry)"
+    output_field = FloatField()
+
+
+class PointY(Func):
+    function = "ST_Y"
+    template = "%(function)s(%(expressions)s::geometry)"
+    output_field = FloatField()
+
+
+# Shared DRF field, so datetimes are rendered exactly like the serializers
+_datetime_field = serializers.DateTimeField()
+
+
+def _datetime(value):
+    if value is None:
+        return None
+    return _datetime_field.to_representation(value)
+
+
+def _point(lng, lat):
+    if lng is None or lat is None:
+        return None
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+def _feature_rows(queryset, fields, limit=None, chunk_size=None):
+    rows = queryset.annotate(
+        lng=PointX("location"), lat=PointY("location")
+    ).values_list(*fields, "lng", "lat")
+    if limit is not None:
+        rows = rows[:limit]
+    if chunk_size:
+        return rows.iterator(chunk_size=chunk_size)
+    return rows
+
+
+MAP_OBSERVATION_VALUES = (
+    "id",
+    "species_name",
+    "common_name",
+    "observation_datetime",
+    "location_name",
+    "image",
+    "depth_min",
+    "depth_max",
+    "bathymetry",
+    "temperature",
+    "visibility",
+    "notes",
+    "sex",
+    "validated",
+    "user_id",
+    "user__username",
+    "created_at",
+    "updated_at",
+)
+
+
+def map_observation_features(queryset, limit=None, chunk_size=None):
+    """
+    Yields the MapObservationSerializer representation of each Observation.
+    :param limit: Maximum number of rows to read.
+    :param chunk_size: If set, read rows through a server-side cursor.
+    """
+    storage = Observation._meta.get_field("image").storage
+    rows = _feature_rows(
+        queryset, MAP_OBSERVATION_VALUES, limit=limit, chunk_size=chunk_size
+    )
+    for (
+        pk,
+        species_name,
+        common_name,
+        observation_datetime,
+        location_name,
+        image,
+        depth_min,
+        depth_max,
+        bathymetry,
+        temperature,
+        visibility,
+        notes,
+        sex,
+        validated,
+        user_id,
+        username,
+        created_at,
+        updated_at,
+        lng,
+        lat,
+    ) in rows:
+        yield {
+            "id": f"user-{pk}",
+            "type": "Feature",
+            "geometry": _point(lng, lat),
+            "properties": {
+                "speciesName": species_name,
+                "commonName": common_name,
+                "observationDatetime": _datetime(observation_datetime),
+                "locationName": location_name,
+                "source": "user",
+                "image": storage.url(image) if image else None,
+                "depthMin": depth_min,
+                "depthMax": depth_max,
+                "bathymetry": bathymetry,
+                "temperature": temperature,
+                "visibility": visibility,
+                "notes": notes,
+                "sex": sex,
+                "validated": validated,
+                "userId": user_id,
+                "username": username,
+                "createdAt": _datetime(created_at),
+                "updatedAt": _datetime(updated_at),
+            },
+        }
+
+
+MAP_CURATED_OBSERVATION_VALUES = (
+    "id",
+    "species_name",
+    "common_name",
+    "observation_datetime",
+    "location_name",
+    "image",
+    "depth_min",
+    "depth_max",
+    "bathymetry",
+    "temperature",
+    "visibility",
+    "notes",
+    "sex",
+    "validated",
+    "user",
+)
+
+
+def map_curated_observation_features(queryset, limit=None, chunk_size=None):
+    """
+    Yields the MapCuratedObservationSerializer representation of each
+    CuratedObservation.
+    :param limit: Maximum number of rows to read.
+    :param chunk_size: If set, read rows through a server-side cursor.
+    """
+    rows = _feature_rows(
+        queryset,
+        MAP_CURATED_OBSERVATION_VALUES,
+        limit=limit,
+        chunk_size=chunk_size,
+    )
+    for (
+        pk,
+        species_name,
+        common_name,
+        observation_datetime,
+        location_name,
+        image,
+        depth_min,
+        depth_max,
+        bathymetry,
+        temperature,
+        visibility,
+        notes,
+        sex,
+        validated,
+        user,
+        lng,
+        lat,
+    ) in rows:
+        yield {
+            "id": f"obis-{pk}",
+            "type": "Feature",
+            "geometry": _point(lng, lat),
+            "properties": {
+                "speciesName": species_name,
+                "commonName": common_name,
+                "observationDatetime": _datetime(observation_datetime),
+                "locationName": location_name,
+                "source": "obis",
+                "image": image,
+                "depthMin": depth_min,
+                "depthMax": depth_max,
+                "bathymetry": bathymetry,
+                "temperature": temperature,
+                "visibility": visibility,
+                "notes": notes,
+                "sex": sex,
+                "validated": validated,
+                "username": user,
+            },
+        }
+
+
+MAP_THIN_VALUES = ("id", "species_name", "observation_datetime")
+
+
+def map_thin_features(queryset, source, limit=None, chunk_size=None):
+    """
+    Yields minimal point features (id, coordinates, source, species and date)
+    for the map's thin mode; the rest is fetched on demand by id.
+    :param source: "user" for Observation rows, "obis" for CuratedObservation.
+    """
+    rows = _feature_rows(
+        queryset, MAP_THIN_VALUES, limit=limit, chunk_size=chunk_size
+    )
+    for pk, species_name, observation_datetime, lng, lat in rows:
+        yield {
+            "id": f"{source}-{pk}",
+            "type": "Feature",
+            "geometry": _point(lng, lat),
+            "properties": {
+                "source": source,
+                "speciesName": species_name,
+                "observationDatetime": _datetime(observation_datetime),
+            },
+        }
@@ -0,0 +1,22 @@
+# backend/map/signals.py
+
+from django.db.models.signals import post_delete, post_save
+
+from observations.models import Observation
+from species.signals import obis_refresh_finished
+
+from .cache import invalidate_map_cache
+
+post_save.connect(
+    invalidate_map_cache,
+    sender=Observation,
+    dispatch_uid="map_cache_observation_saved",
+)
+post_delete.connect(
+    invalidate_map_cache,
+    sender=Observation,
+    dispatch_uid="map_cache_observation_deleted",
+)
+obis_refresh_finished.connect(
+    invalidate_map_cache, dispatch_uid="map_cache_obis_refresh_finished"
+)
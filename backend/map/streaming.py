@@ -0,0 +1,44 @@
+# backend/map/streaming.py
+
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def stream_feature_collection(feature_iterables, batch_size=500, limit=None):
+    """
+    Yields a GeoJSON FeatureCollection as text chunks of `batch_size`
+    features, encoded the same way as DRF's JSONRenderer.
+    :param feature_iterables: Iterables of GeoJSON feature dicts, streamed
+                              one after the other.
+    :param limit: Maximum number of features to write. The collection ends
+                  with a "truncated" flag telling whether more were left.
+    """
+    yield '{"type":"FeatureCollection","features":['
+    separator = ""
+    batch = []
+    count = 0
+    truncated = False
+    for features in feature_iterables:
+        for feature in features:
+            if limit is not None and count >= limit:
+                truncated = True
+                break
+            count += 1
+            batch.append(
+                json.dumps(
+                    feature,
+                    cls=JSONEncoder,
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                )
+            )
+            if len(batch) >= batch_size:
+                yield separator + ",".join(batch)
+                separator = ","
+                batch = []
+        if truncated:
+            break
+    if batch:
+        yield separator + ",".join(batch)
+    yield '],"truncated":%s}' % ("true" if truncated else "false")
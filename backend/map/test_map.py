@@ -1,12 +1,43 @@
+import datetime
+import json
+
 import pytest
-from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from map.cache import map_cache
+from map.queries import KnnDistance, filter_bbox
+from map.serializers import (
+    MapCuratedObservationSerializer,
+    MapObservationSerializer,
+    map_curated_observation_features,
+    map_observation_features,
+)
+from map.views import parse_bbox
+from observations.models import Observation
+from species.models import CuratedObservation, EtlRun
+from species.signals import obis_refresh_finished
 
 User = get_user_model()
 
 pytestmark = pytest.mark.django_db
 
 MAP_OBS_URL = "/api/v1/map/observations/"
+MAP_TILE_URL = "/api/v1/map/tiles/{z}/{x}/{y}.pbf"
+MAP_FEATURES_URL = "/api/v1/map/features/"
+MAP_DENSITY_URL = "/api/v1/map/density/"
+MAP_NEAREST_URL = "/api/v1/map/nearest/"
+
+
+@pytest.fixture(autouse=True)
+def clear_map_cache():
+    map_cache().clear()
 
 
 @pytest.fixture
@@ -133,3 +164,522 @@ def test_map_query_no_params_returns_all(auth_user):
     notes = [f["properties"]["notes"] for f in resp.json()["features"]]
     assert "Paris" in notes
     assert "Tokyo" in notes
+
+
+def test_map_query_bbox_filters_features(auth_user):
+    """
+    Only observations inside the bbox are returned.
+    """
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    make_observation(auth_user, [139.76, 35.68], notes="Tokyo")
+    resp = auth_user.get(f"{MAP_OBS_URL}?bbox=-5,40,10,55")
+    assert resp.status_code == 200
+    notes = [f["properties"]["notes"] for f in resp.json()["features"]]
+    assert notes == ["Paris"]
+
+
+def test_map_query_invalid_bbox(auth_user):
+    resp = auth_user.get(f"{MAP_OBS_URL}?bbox=1,2,3")
+    assert resp.status_code == 400
+
+
+def test_map_cluster_groups_nearby_points(auth_user):
+    """
+    At low zoom, nearby points collapse into a single cluster feature.
+    """
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    make_observation(auth_user, [2.13, 48.80], notes="Versailles")
+    make_observation(auth_user, [139.76, 35.68], notes="Tokyo")
+    resp = auth_user.get(f"{MAP_OBS_URL}?cluster=1&z=3")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["clustered"] is True
+    counts = sorted(f["properties"]["pointCount"] for f in body["features"])
+    assert counts == [1, 2]
+    biggest = max(
+        body["features"], key=lambda f: f["properties"]["pointCount"]
+    )
+    assert biggest["properties"]["topSpecies"] == "TestFish"
+    lng, lat = biggest["geometry"]["coordinates"]
+    assert 2.13 <= lng <= 2.35
+    assert 48.80 <= lat <= 48.85
+
+
+def test_map_cluster_output_is_limited(auth_user):
+    """
+    Cluster responses are capped like individual features, keeping the most
+    populated cells.
+    """
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    make_observation(auth_user, [2.13, 48.80], notes="Versailles")
+    make_observation(auth_user, [139.76, 35.68], notes="Tokyo")
+    resp = auth_user.get(f"{MAP_OBS_URL}?cluster=1&z=3&limit=1")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["truncated"] is True
+    assert [f["properties"]["pointCount"] for f in body["features"]] == [2]
+
+    resp = auth_user.get(f"{MAP_OBS_URL}?cluster=1&z=3&limit=2")
+    assert resp.json()["truncated"] is False
+
+
+def test_map_cluster_high_zoom_returns_individual_features(auth_user):
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    make_observation(auth_user, [2.13, 48.80], notes="Versailles")
+    resp = auth_user.get(f"{MAP_OBS_URL}?cluster=1&z=18")
+    assert resp.status_code == 200
+    notes = {f["properties"]["notes"] for f in resp.json()["features"]}
+    assert notes == {"Paris", "Versailles"}
+
+
+def test_map_cluster_invalid_zoom(auth_user):
+    resp = auth_user.get(f"{MAP_OBS_URL}?cluster=1&z=99")
+    assert resp.status_code == 400
+
+
+def test_map_tile_contains_observation(auth_user):
+    """
+    The tile covering Paris is a vector tile carrying the observation.
+    """
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    resp = auth_user.get(
+        MAP_TILE_URL.format(z=10, x=518, y=352),
+        HTTP_ACCEPT="application/x-protobuf",
+    )
+    assert resp.status_code == 200
+    assert resp["Content-Type"] == "application/vnd.mapbox-vector-tile"
+    assert b"observations" in resp.content
+    assert b"TestFish" in resp.content
+    # Detail properties are included at this zoom
+    assert b"geomapper2" in resp.content
+
+
+def test_map_tile_low_zoom_is_trimmed(auth_user):
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    resp = auth_user.get(MAP_TILE_URL.format(z=0, x=0, y=0))
+    assert resp.status_code == 200
+    assert b"TestFish" in resp.content
+    assert b"Paris" not in resp.content
+
+
+def test_map_tile_world_zoom_levels(auth_user):
+    """
+    Tiles spanning a hemisphere or the whole world are filtered in planar
+    lon/lat, so they are not emptied by degenerate geography edges.
+    """
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    make_observation(auth_user, [-74.0, 40.7], notes="New York")
+    for z, x, y in ((1, 1, 0), (1, 0, 0), (2, 2, 1)):
+        resp = auth_user.get(MAP_TILE_URL.format(z=z, x=x, y=y))
+        assert resp.status_code == 200
+        assert b"TestFish" in resp.content
+    assert auth_user.get(MAP_TILE_URL.format(z=1, x=1, y=1)).status_code == 204
+
+
+def test_map_tile_includes_points_in_buffer(auth_user):
+    # Just west of the tile 10/518/352, within its 64/4096 buffer
+    make_observation(auth_user, [2.107, 48.85], notes="Edge")
+    resp = auth_user.get(
+        MAP_TILE_URL.format(z=10, x=518, y=352),
+        HTTP_ACCEPT="application/x-protobuf",
+    )
+    assert resp.status_code == 200
+    assert b"Edge" in resp.content
+
+
+def test_map_tile_empty(auth_user):
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    resp = auth_user.get(MAP_TILE_URL.format(z=10, x=0, y=0))
+    assert resp.status_code == 204
+
+
+def test_map_tile_invalid_coordinates(auth_user):
+    resp = auth_user.get(MAP_TILE_URL.format(z=2, x=4, y=0))
+    assert resp.status_code == 400
+
+
+def test_map_stream_matches_regular_response(auth_user):
+    """
+    Streaming mode returns the same FeatureCollection as the regular mode.
+    """
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    make_observation(auth_user, [139.76, 35.68], notes="Tokyo")
+    regular = auth_user.get(MAP_OBS_URL)
+    streamed = auth_user.get(f"{MAP_OBS_URL}?stream=1")
+    assert streamed.status_code == 200
+    assert streamed.streaming
+    body = json.loads(b"".join(streamed.streaming_content))
+    assert body == regular.json()
+
+
+def test_map_query_bbox_across_antimeridian(auth_user):
+    make_observation(auth_user, [179.5, 0], notes="East")
+    make_observation(auth_user, [-179.5, 0], notes="West")
+    make_observation(auth_user, [0, 0], notes="Null Island")
+    resp = auth_user.get(f"{MAP_OBS_URL}?bbox=170,-10,-170,10")
+    assert resp.status_code == 200
+    notes = {f["properties"]["notes"] for f in resp.json()["features"]}
+    assert notes == {"East", "West"}
+
+
+def test_map_query_world_bbox(auth_user):
+    """
+    A world viewport (zoom 0-2) keeps every observation: the bbox is tested
+    in planar lon/lat, not as a geography polygon collapsing onto the
+    antimeridian.
+    """
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    make_observation(auth_user, [139.76, 35.68], notes="Tokyo")
+    make_observation(auth_user, [-74.0, 40.7], notes="New York")
+    for query in (
+        "bbox=-180,-85,180,85",
+        "cluster=1&z=0&bbox=-180,-85,180,85",
+    ):
+        resp = auth_user.get(f"{MAP_OBS_URL}?{query}")
+        assert resp.status_code == 200
+        features = resp.json()["features"]
+        assert sum(f["properties"].get("pointCount", 1) for f in features) == 3
+    resp = auth_user.get(f"{MAP_DENSITY_URL}?bbox=-180,-85,180,85")
+    assert resp.status_code == 200
+    counts = [f["properties"]["count"] for f in resp.json()["features"]]
+    assert sum(counts) == 3
+
+
+def test_map_query_bbox_wider_than_half_the_globe(auth_user):
+    """
+    A box wider than 180 degrees keeps its lon/lat edges instead of taking
+    the short side of the globe.
+    """
+    make_observation(auth_user, [-120, 10], notes="Pacific East")
+    make_observation(auth_user, [90, -10], notes="Indian Ocean")
+    make_observation(auth_user, [150, 0], notes="Pacific West")
+    make_observation(auth_user, [0, 65], notes="Norwegian Sea")
+    resp = auth_user.get(f"{MAP_OBS_URL}?bbox=-150,-60,100,60")
+    assert resp.status_code == 200
+    notes = {f["properties"]["notes"] for f in resp.json()["features"]}
+    assert notes == {"Pacific East", "Indian Ocean"}
+
+
+@pytest.mark.parametrize("model", [Observation, CuratedObservation])
+def test_map_bbox_filter_uses_geometry_index(model):
+    queryset = filter_bbox(model.objects.all(), parse_bbox("-5,40,10,55"))
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+    assert "location_geom_gist" in plan
+
+
+def test_map_query_limit_sets_truncated_flag(auth_user):
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    make_observation(auth_user, [139.76, 35.68], notes="Tokyo")
+
+    resp = auth_user.get(f"{MAP_OBS_URL}?limit=1")
+    assert resp.status_code == 200
+    assert len(resp.json()["features"]) == 1
+    assert resp.json()["truncated"] is True
+
+    resp = auth_user.get(f"{MAP_OBS_URL}?limit=2")
+    assert len(resp.json()["features"]) == 2
+    assert resp.json()["truncated"] is False
+
+
+def test_map_query_server_side_max_features(auth_user, settings):
+    settings.MAP_MAX_FEATURES = 1
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    make_observation(auth_user, [139.76, 35.68], notes="Tokyo")
+    resp = auth_user.get(f"{MAP_OBS_URL}?limit=100")
+    assert len(resp.json()["features"]) == 1
+    assert resp.json()["truncated"] is True
+
+    streamed = auth_user.get(f"{MAP_OBS_URL}?stream=1")
+    body = json.loads(b"".join(streamed.streaming_content))
+    assert len(body["features"]) == 1
+    assert body["truncated"] is True
+
+
+def test_map_query_invalid_limit(auth_user):
+    resp = auth_user.get(f"{MAP_OBS_URL}?limit=0")
+    assert resp.status_code == 400
+
+
+def test_fast_map_features_match_serializers(auth_user):
+    """
+    The values_list() fast path renders byte-identical JSON to the DRF map
+    serializers, for both sources.
+    """
+    user = User.objects.get(username="geomapper2")
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    obs = Observation.objects.create(
+        user=user,
+        species_name="Manta",
+        location=Point(-0.1234567891234, 51.5),
+        observation_datetime=datetime.datetime(
+            2024, 5, 1, 8, 30, 15, 123456, tzinfo=datetime.timezone.utc
+        ),
+        location_name="London",
+        depth_min=0.0,
+    )
+    Observation.objects.filter(pk=obs.pk).update(
+        image="observation_pics/manta.jpg"
+    )
+    CuratedObservation.objects.create(
+        obis_id="obis-a",
+        species_name="Carcharodon carcharias",
+        common_name="Great White Shark",
+        observation_datetime=datetime.datetime(
+            2020, 1, 2, tzinfo=datetime.timezone.utc
+        ),
+        location=Point(18.4, -34.1),
+        validated="validated",
+        image="https://example.com/shark.jpg",
+        temperature=17.25,
+        user="curator",
+    )
+    CuratedObservation.objects.create(obis_id="obis-b", species_name="Nowhere")
+
+    renderer = JSONRenderer()
+    user_qs = Observation.objects.all()
+    curated_qs = CuratedObservation.objects.all()
+    assert renderer.render(list(map_observation_features(user_qs))) == (
+        renderer.render(
+            MapObservationSerializer(
+                MapObservationSerializer.setup_eager_loading(user_qs),
+                many=True,
+            ).data["features"]
+        )
+    )
+    assert renderer.render(
+        list(map_curated_observation_features(curated_qs))
+    ) == renderer.render(
+        MapCuratedObservationSerializer(curated_qs, many=True).data["features"]
+    )
+
+
+def test_map_conditional_get(auth_user):
+    """
+    Unchanged map data is answered with 304; new user observations or a new
+    ETL watermark change the ETag.
+    """
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    resp = auth_user.get(MAP_OBS_URL)
+    etag = resp["ETag"]
+    assert "Last-Modified" in resp
+
+    resp = auth_user.get(MAP_OBS_URL, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 304
+
+    make_observation(auth_user, [139.76, 35.68], notes="Tokyo")
+    resp = auth_user.get(MAP_OBS_URL, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    etag = resp["ETag"]
+
+    EtlRun.objects.create(data_changed_at=timezone.now())
+    resp = auth_user.get(MAP_OBS_URL, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert resp["ETag"] != etag
+
+
+def test_map_response_is_cached_per_rounded_query(auth_user):
+    """
+    Requests rounding to the same query share a cache entry. queryset.update()
+    fires no signal and keeps updated_at, so the cached copy is still served.
+    """
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    resp = auth_user.get(f"{MAP_OBS_URL}?lat=48.85&lng=2.35&radius=50")
+    assert resp.json()["features"][0]["properties"]["notes"] == "Paris"
+
+    Observation.objects.update(notes="Changed")
+    resp = auth_user.get(
+        f"{MAP_OBS_URL}?lat=48.85001&lng=2.35001&radius=50.01&_=123"
+    )
+    assert resp.json()["features"][0]["properties"]["notes"] == "Paris"
+
+    resp = auth_user.get(f"{MAP_OBS_URL}?lat=48.86&lng=2.35&radius=50")
+    assert resp.json()["features"][0]["properties"]["notes"] == "Changed"
+
+
+def test_map_cache_invalidated_on_observation_save(auth_user):
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    auth_user.get(MAP_OBS_URL)
+    Observation.objects.update(notes="Changed")
+    Observation.objects.get().save()
+    resp = auth_user.get(MAP_OBS_URL)
+    assert resp.json()["features"][0]["properties"]["notes"] == "Changed"
+
+
+def test_map_cache_invalidated_after_obis_refresh(auth_user):
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    auth_user.get(MAP_OBS_URL)
+    Observation.objects.update(notes="Changed")
+    obis_refresh_finished.send(sender=EtlRun, run=None)
+    resp = auth_user.get(MAP_OBS_URL)
+    assert resp.json()["features"][0]["properties"]["notes"] == "Changed"
+
+
+def test_map_thin_mode_and_feature_details(auth_user):
+    """
+    Thin features only carry what is needed to draw and label points; the
+    details endpoint returns the full features, in the requested order.
+    """
+    obs = make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    curated = CuratedObservation.objects.create(
+        obis_id="obis-a",
+        species_name="Carcharodon carcharias",
+        location=Point(18.4, -34.1),
+        observation_datetime=datetime.datetime(
+            2020, 1, 2, tzinfo=datetime.timezone.utc
+        ),
+        user="curator",
+    )
+
+    resp = auth_user.get(f"{MAP_OBS_URL}?thin=1")
+    assert resp.status_code == 200
+    features = {f["id"]: f for f in resp.json()["features"]}
+    assert features[f"user-{obs['id']}"]["properties"] == {
+        "source": "user",
+        "speciesName": "TestFish",
+        "observationDatetime": "2025-11-01T12:00:00Z",
+    }
+    assert features[f"obis-{curated.pk}"]["geometry"] == {
+        "type": "Point",
+        "coordinates": [18.4, -34.1],
+    }
+
+    resp = auth_user.get(
+        f"{MAP_FEATURES_URL}?ids=obis-{curated.pk},user-{obs['id']},user-0"
+    )
+    assert resp.status_code == 200
+    features = resp.json()["features"]
+    assert [f["id"] for f in features] == [
+        f"obis-{curated.pk}",
+        f"user-{obs['id']}",
+    ]
+    assert features[0]["properties"]["username"] == "curator"
+    assert features[1]["properties"]["notes"] == "Paris"
+
+
+def test_map_feature_details_invalid_ids(auth_user, settings):
+    settings.MAP_MAX_DETAIL_IDS = 2
+    for ids in ("", "user-x", "shark-1", "user-1,user-2,obis-3"):
+        resp = auth_user.get(f"{MAP_FEATURES_URL}?ids={ids}")
+        assert resp.status_code == 400
+
+
+def test_map_density_counts_per_cell(auth_user):
+    """
+    Points of both sources are counted per grid cell, with species and date
+    filters applied before aggregation.
+    """
+    make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    make_observation(auth_user, [2.36, 48.86], notes="Paris 2")
+    make_observation(auth_user, [-0.13, 51.51], notes="London")
+    CuratedObservation.objects.create(
+        obis_id="obis-a",
+        species_name="Carcharodon carcharias",
+        common_name="Great White Shark",
+        location=Point(2.34, 48.84),
+        observation_datetime=datetime.datetime(
+            2020, 1, 2, tzinfo=datetime.timezone.utc
+        ),
+    )
+
+    for shape in ("hex", "square"):
+        resp = auth_user.get(
+            f"{MAP_DENSITY_URL}?bbox=-5,45,5,55&shape={shape}&size=1"
+        )
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["shape"] == shape
+        counts = sorted(f["properties"]["count"] for f in data["features"])
+        assert counts == [1, 3]
+        assert data["features"][0]["geometry"]["type"] == "Polygon"
+
+    resp = auth_user.get(
+        f"{MAP_DENSITY_URL}?bbox=-5,45,5,55&species=great white shark"
+    )
+    assert [f["properties"]["count"] for f in resp.json()["features"]] == [1]
+
+    resp = auth_user.get(
+        f"{MAP_DENSITY_URL}?bbox=-5,45,5,55&start_date=2025-01-01"
+    )
+    assert sum(f["properties"]["count"] for f in resp.json()["features"]) == 3
+
+
+def test_map_density_invalid_params(auth_user, settings):
+    settings.MAP_DENSITY_MAX_CELLS = 100
+    for query in (
+        "",
+        "bbox=1,2,3",
+        "bbox=-5,45,5,55&shape=circle",
+        "bbox=-5,45,5,55&size=0",
+        "bbox=-180,-90,180,90&size=1",
+        "bbox=-5,45,5,55&start_date=2025-13-01",
+    ):
+        resp = auth_user.get(f"{MAP_DENSITY_URL}?{query}")
+        assert resp.status_code == 400
+
+
+@pytest.mark.parametrize("model", [Observation, CuratedObservation])
+def test_map_radius_query_uses_spatial_index(model):
+    """
+    The radius filter compiles to ST_DWithin, which the planner can run as
+    an index scan on the location GiST index.
+    """
+    queryset = model.objects.filter(
+        location__dwithin=(Point(2.35, 48.85), D(km=50))
+    )
+    assert "ST_DWithin" in str(queryset.query)
+    with connection.cursor() as cursor:
+        # Tiny test tables would otherwise always be scanned sequentially
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+    assert "Index Cond" in plan
+    assert "location" in plan
+
+
+def test_map_nearest_orders_both_sources_by_distance(auth_user):
+    paris = make_observation(auth_user, [2.35, 48.85], notes="Paris")
+    make_observation(auth_user, [-0.13, 51.51], notes="London")
+    shark = CuratedObservation.objects.create(
+        obis_id="obis-a",
+        species_name="Carcharodon carcharias",
+        common_name="Great White Shark",
+        location=Point(2.5, 48.9),
+    )
+    CuratedObservation.objects.create(obis_id="obis-b", species_name="None")
+
+    resp = auth_user.get(f"{MAP_NEAREST_URL}?lat=48.85&lng=2.35&k=2")
+    assert resp.status_code == 200
+    features = resp.json()["features"]
+    assert [f["id"] for f in features] == [
+        f"user-{paris['id']}",
+        f"obis-{shark.pk}",
+    ]
+    assert features[0]["properties"]["distance"] == pytest.approx(0, abs=1)
+    assert features[1]["properties"]["distance"] == pytest.approx(
+        12000, rel=0.1
+    )
+
+    resp = auth_user.get(
+        f"{MAP_NEAREST_URL}?lat=51.5&lng=0&species=great white shark"
+    )
+    assert [f["id"] for f in resp.json()["features"]] == [f"obis-{shark.pk}"]
+
+
+def test_map_nearest_invalid_params(auth_user, settings):
+    settings.MAP_NEAREST_MAX_K = 10
+    for query in ("lat=48.85", "lat=95&lng=0", "lat=1&lng=1&k=0", "k=11"):
+        resp = auth_user.get(f"{MAP_NEAREST_URL}?{query}")
+        assert resp.status_code == 400
+
+
+def test_map_nearest_uses_knn_index_scan():
+    queryset = Observation.objects.annotate(
+        distance=KnnDistance(F("location"), Point(2.35, 48.85))
+    ).order_by("distance")[:20]
+    assert "<->" in str(queryset.query)
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+    assert "Index Scan" in plan
+    assert "Order By" in plan
@@ -0,0 +1,93 @@
+"""
+Benchmark of the map serialization fast path against the DRF serializers.
+Skipped unless MAP_BENCHMARK_ROWS is set, e.g.:
+
+    MAP_BENCHMARK_ROWS=100000 pytest map/test_map_benchmark.py -s
+"""
+
+import datetime
+import os
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import Point
+
+from map.serializers import (
+    MapCuratedObservationSerializer,
+    MapObservationSerializer,
+    map_curated_observation_features,
+    map_observation_features,
+)
+from observations.models import Observation
+from species.models import CuratedObservation
+
+User = get_user_model()
+
+BENCHMARK_ROWS = int(os.environ.get("MAP_BENCHMARK_ROWS", 0))
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        not BENCHMARK_ROWS, reason="Set MAP_BENCHMARK_ROWS to run."
+    ),
+]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def test_fast_path_speedup():
+    user = User.objects.create_user(
+        email="bench@example.com", username="bench", password="Bench$123"
+    )
+    now = datetime.datetime.now(datetime.timezone.utc)
+    half = BENCHMARK_ROWS // 2
+    Observation.objects.bulk_create(
+        Observation(
+            user=user,
+            species_name=f"Species {i % 250}",
+            location=Point(-180 + (i % 3600) / 10, -80 + (i % 1600) / 10),
+            observation_datetime=now,
+            location_name="Benchmark reef",
+            temperature=20.5,
+            notes="Benchmark row",
+        )
+        for i in range(half)
+    )
+    CuratedObservation.objects.bulk_create(
+        CuratedObservation(
+            obis_id=f"bench-{i}",
+            species_name=f"Species {i % 250}",
+            observation_datetime=now,
+            location=Point(-180 + (i % 3600) / 10, -80 + (i % 1600) / 10),
+            location_name="OBIS record",
+            validated="validated",
+        )
+        for i in range(BENCHMARK_ROWS - half)
+    )
+    user_qs = Observation.objects.all()
+    curated_qs = CuratedObservation.objects.all()
+
+    slow, slow_time = timed(
+        lambda: MapObservationSerializer(
+            MapObservationSerializer.setup_eager_loading(user_qs), many=True
+        ).data["features"]
+        + MapCuratedObservationSerializer(curated_qs, many=True).data[
+            "features"
+        ]
+    )
+    fast, fast_time = timed(
+        lambda: list(map_observation_features(user_qs))
+        + list(map_curated_observation_features(curated_qs))
+    )
+
+    print(
+        f"\n{BENCHMARK_ROWS} rows: DRF serializers {slow_time:.2f}s,"
+        f" fast path {fast_time:.2f}s ({slow_time / fast_time:.1f}x)"
+    )
+    assert len(fast) == len(slow) == BENCHMARK_ROWS
+    assert fast_time * 3 < slow_time
@@ -1,8 +1,22 @@
 # backend/map/urls.py
 
 from django.urls import path
-from .views import map_observations
+from .views import (
+    MapTileView,
+    map_density,
+    map_feature_details,
+    map_nearest,
+    map_observations,
+)
 
 urlpatterns = [
     path("observations/", map_observations, name="map-observations"),
+    path("features/", map_feature_details, name="map-feature-details"),
+    path("density/", map_density, name="map-density"),
+    path("nearest/", map_nearest, name="map-nearest"),
+    path(
+        "tiles/<int:z>/<int:x>/<int:y>.pbf",
+        MapTileView.as_view(),
+        name="map-tile",
+    ),
 ]
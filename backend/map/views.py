@@ -1,18 +1,173 @@
 # backend/map/views.py
 
-from django.contrib.gis.geos import Point
+import json
+from functools import partial
+
+from django.conf import settings
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
 from django.contrib.gis.measure import D
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.negotiation import BaseContentNegotiation
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from core.conditional import (
+    latest,
+    make_etag,
+    not_modified_response,
+    queryset_version,
+    set_validators,
+)
 from observations.models import Observation
-from species.models import CuratedObservation
+from species.models import CuratedObservation, EtlRun
 
+from .cache import map_cache, map_cache_key, normalize_map_params
+from .queries import (
+    DENSITY_GRIDS,
+    cluster_points,
+    density_cells,
+    filter_bbox,
+    nearest_points,
+    render_tile,
+)
 from .serializers import (
-    MapObservationSerializer,
-    MapCuratedObservationSerializer,
+    map_curated_observation_features,
+    map_observation_features,
+    map_thin_features,
 )
+from .streaming import stream_feature_collection
+
+MAX_ZOOM = 22
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """
+    Tile clients send protobuf Accept headers that no DRF renderer matches;
+    tiles are returned as raw HttpResponses, so only errors need rendering.
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
+def parse_bbox(value):
+    """
+    Parses a "minLon,minLat,maxLon,maxLat" string into a Polygon.
+    A viewport crossing the antimeridian (minLon > maxLon) is split into a
+    MultiPolygon of the two boxes on either side of it.
+    Raises ValueError if the string is malformed or out of range.
+    """
+    min_lon, min_lat, max_lon, max_lat = (
+        float(coord) for coord in value.split(",")
+    )
+    if not (
+        -180 <= min_lon <= 180
+        and -180 <= max_lon <= 180
+        and -90 <= min_lat <= max_lat <= 90
+    ):
+        raise ValueError(f"Invalid bbox: {value}")
+    if min_lon > max_lon:
+        return MultiPolygon(
+            Polygon.from_bbox((min_lon, min_lat, 180, max_lat)),
+            Polygon.from_bbox((-180, min_lat, max_lon, max_lat)),
+            srid=4326,
+        )
+    polygon = Polygon.from_bbox((min_lon, min_lat, max_lon, max_lat))
+    polygon.srid = 4326
+    return polygon
+
+
+def parse_limit(value):
+    """
+    Parses the requested maximum number of features, capped to
+    MAP_MAX_FEATURES. Raises ValueError if not a positive integer.
+    """
+    if value is None:
+        return settings.MAP_MAX_FEATURES
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("Limit must be a positive integer.")
+    return min(limit, settings.MAP_MAX_FEATURES)
+
+
+def limit_features(sources, limit):
+    """
+    Collects features from (queryset, features function) sources, in order,
+    until `limit` features are collected, reading at most one extra row to
+    detect truncation.
+    :return: Tuple (list of features, truncated flag)
+    """
+    features = []
+    for queryset, to_features in sources:
+        remaining = limit - len(features)
+        batch = list(to_features(queryset, limit=remaining + 1))
+        if len(batch) > remaining:
+            return features + batch[:remaining], True
+        features.extend(batch)
+    return features, False
+
+
+def is_enabled(params, name):
+    """Whether a boolean query parameter (e.g. ?cluster=1) is switched on."""
+    return params.get(name, "").lower() in ("1", "true")
+
+
+def parse_zoom(value):
+    """Parses a web map zoom level, raising ValueError if out of range."""
+    zoom = int(value)
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise ValueError(f"Zoom level must be between 0 and {MAX_ZOOM}.")
+    return zoom
+
+
+def cluster_cell_size(zoom):
+    """
+    Size (in degrees) of a cluster grid cell at the given zoom, so that a
+    cell always covers MAP_CLUSTER_GRID_PX pixels on screen.
+    """
+    tile_px = 256
+    return 360.0 / (tile_px * 2**zoom) * settings.MAP_CLUSTER_GRID_PX
+
+
+def cluster_features(clusters):
+    """Converts cluster rows into GeoJSON features."""
+    return [
+        {
+            "type": "Feature",
+            "id": f"cluster-{int(cluster['cx'])}-{int(cluster['cy'])}",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [cluster["lng"], cluster["lat"]],
+            },
+            "properties": {
+                "cluster": True,
+                "pointCount": cluster["point_count"],
+                "topSpecies": cluster["top_species"],
+            },
+        }
+        for cluster in clusters
+    ]
+
+
+def map_dataset_version():
+    """
+    ETag and Last-Modified of the map data: the latest change and row count
+    of Observation, plus the curated dataset's ETL watermark.
+    """
+    last_updated, count = queryset_version(Observation.objects.all())
+    watermark = EtlRun.watermark()
+    return (
+        make_etag("map", last_updated, count, watermark),
+        latest(last_updated, watermark),
+    )
 
 
 @api_view(["GET"])
@@ -21,11 +176,62 @@ def map_observations(request):
     """
     Geo-filtered observations for the map.
     Params: ?lat=<latitude>&lng=<longitude>&radius=<km>
+            &bbox=<minLon,minLat,maxLon,maxLat>
+            &cluster=1&z=<zoom>
+            &stream=1&limit=<max features>
+            &thin=1
+    With cluster=1, points are grouped per grid cell (one feature per cell)
+    until the zoom reaches MAP_CLUSTER_MAX_ZOOM; individual features are
+    returned from that zoom on.
+    With stream=1, features are read through server-side cursors and written
+    to the response as they are serialized.
+    At most MAP_MAX_FEATURES features (individual or clusters, the most
+    populated first) are returned; "truncated" tells whether more matched
+    the query.
+    With thin=1, features only carry id, coordinates, source, species and
+    date; full properties are fetched by id from map_feature_details.
+    Responses carry an ETag/Last-Modified derived from the dataset version,
+    and conditional requests are answered with 304 without querying it.
+    Non-streamed responses are cached per normalized query parameters.
+    """
+    etag, last_modified = map_dataset_version()
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return set_validators(not_modified, etag, last_modified)
+
+    params = normalize_map_params(request.GET)
+    cache_key = None
+    if not is_enabled(params, "stream"):
+        cache_key = map_cache_key(etag, params)
+        content = map_cache().get(cache_key)
+        if content is not None:
+            return set_validators(
+                HttpResponse(content, content_type="application/json"),
+                etag,
+                last_modified,
+            )
+
+    response = build_map_response(params)
+    if response.status_code != 200:
+        return response
+    if cache_key:
+        # Cache the rendered JSON, cheaper to store and serve than the data
+        content = JSONRenderer().render(response.data)
+        map_cache().set(cache_key, content)
+        response = HttpResponse(content, content_type="application/json")
+    return set_validators(response, etag, last_modified)
+
+
+def build_map_response(params):
+    """
+    Runs the map query described in map_observations.
+    :param params: Normalized query parameters (see normalize_map_params).
     """
 
-    lat = request.GET.get("lat")
-    lng = request.GET.get("lng")
-    radius = request.GET.get("radius", 50)
+    lat = params.get("lat")
+    lng = params.get("lng")
+    radius = params.get("radius", 50)
+    bbox = params.get("bbox")
 
     user_observations_queryset = Observation.objects.all()
     curated_species_queryset = CuratedObservation.objects.all()
@@ -36,12 +242,13 @@ def map_observations(request):
             point = Point(float(lng), float(lat))  # Note order: lng, lat!
             distance_filter = D(km=radius)
 
-            # Apply geo-filtering to both querysets
+            # Apply geo-filtering to both querysets. ST_DWithin (unlike
+            # ST_Distance <= radius) can use the GiST index on location.
             user_observations_queryset = user_observations_queryset.filter(
-                location__distance_lte=(point, distance_filter)
+                location__dwithin=(point, distance_filter)
             )
             curated_species_queryset = curated_species_queryset.filter(
-                location__distance_lte=(point, distance_filter)
+                location__dwithin=(point, distance_filter)
             )
         except (TypeError, ValueError) as e:
             print(f"Error in geo-filtering parameters: {e}")
@@ -59,28 +266,360 @@ def map_observations(request):
                 status=500,
             )
 
-    try:
-        # Serialize both querysets using the correct Map serializers
-        user_serializer = MapObservationSerializer(
-            user_observations_queryset, many=True
+    if bbox:
+        try:
+            bbox_polygon = parse_bbox(bbox)
+        except (TypeError, ValueError):
+            return Response(
+                {
+                    "detail": (
+                        "Invalid bbox, expected minLon,minLat,maxLon,maxLat."
+                    )
+                },
+                status=400,
+            )
+        user_observations_queryset = filter_bbox(
+            user_observations_queryset, bbox_polygon
         )
-        curated_serializer = MapCuratedObservationSerializer(
-            curated_species_queryset, many=True
+        curated_species_queryset = filter_bbox(
+            curated_species_queryset, bbox_polygon
         )
 
-        # Combine the features from both serializers
-        combined_features = (
-            user_serializer.data["features"]
-            + curated_serializer.data["features"]
+    try:
+        limit = parse_limit(params.get("limit"))
+    except (TypeError, ValueError):
+        return Response({"detail": "Invalid limit."}, status=400)
+
+    if is_enabled(params, "cluster"):
+        try:
+            zoom = parse_zoom(params.get("z", 0))
+        except (TypeError, ValueError):
+            return Response({"detail": "Invalid zoom level."}, status=400)
+
+        if zoom < settings.MAP_CLUSTER_MAX_ZOOM:
+            clusters = cluster_points(
+                [user_observations_queryset, curated_species_queryset],
+                cluster_cell_size(zoom),
+                limit=limit + 1,
+            )
+            return Response({
+                "type": "FeatureCollection",
+                "clustered": True,
+                "features": cluster_features(clusters[:limit]),
+                "truncated": len(clusters) > limit,
+            })
+
+    if is_enabled(params, "thin"):
+        sources = [
+            (
+                user_observations_queryset,
+                partial(map_thin_features, source="user"),
+            ),
+            (
+                curated_species_queryset,
+                partial(map_thin_features, source="obis"),
+            ),
+        ]
+    else:
+        sources = [
+            (user_observations_queryset, map_observation_features),
+            (curated_species_queryset, map_curated_observation_features),
+        ]
+
+    if is_enabled(params, "stream"):
+        chunk_size = settings.MAP_STREAM_CHUNK_SIZE
+        return StreamingHttpResponse(
+            stream_feature_collection(
+                [
+                    to_features(
+                        queryset, limit=limit + 1, chunk_size=chunk_size
+                    )
+                    for queryset, to_features in sources
+                ],
+                batch_size=chunk_size,
+                limit=limit,
+            ),
+            content_type="application/json",
         )
 
+    try:
+        # Features are built straight from .values_list() rows; the output is
+        # identical to MapObservationSerializer/MapCuratedObservationSerializer
+        features, truncated = limit_features(sources, limit)
+
         # Return a single GeoJSON FeatureCollection containing all combined features
-        return Response(
-            {"type": "FeatureCollection", "features": combined_features}
-        )
+        return Response({
+            "type": "FeatureCollection",
+            "features": features,
+            "truncated": truncated,
+        })
     except Exception as e:
         print(f"Error during serialization or response generation: {e}")
         return Response(
             {"detail": "An error occurred while processing map observations."},
             status=500,
         )
+
+
+def density_cell_size(polygons, value):
+    """
+    Grid cell size (degrees) for the density endpoint: the requested one, or
+    the one fitting MAP_DENSITY_GRID_CELLS cells across the widest side of
+    the bbox. Raises ValueError if invalid or if the grid would have more
+    than MAP_DENSITY_MAX_CELLS cells.
+    """
+    extents = [polygon.extent for polygon in polygons]
+    width = sum(max_lon - min_lon for min_lon, _, max_lon, _ in extents)
+    height = extents[0][3] - extents[0][1]
+    if value is None:
+        cell_size = max(width, height) / settings.MAP_DENSITY_GRID_CELLS
+    else:
+        cell_size = float(value)
+    if not cell_size > 0:
+        raise ValueError("Cell size must be positive.")
+    if (width / cell_size) * (height / cell_size) > (
+        settings.MAP_DENSITY_MAX_CELLS
+    ):
+        raise ValueError("Too many cells, use a larger cell size.")
+    return cell_size
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def map_density(request):
+    """
+    Observation counts per grid cell, for density maps / heatmaps over areas
+    where individual points are too many to draw.
+    Params: ?bbox=<minLon,minLat,maxLon,maxLat> (required)
+            &shape=hex|square&size=<cell size in degrees>
+            &species=<scientific or common name>
+            &start_date=<YYYY-MM-DD>&end_date=<YYYY-MM-DD>
+    Returns a FeatureCollection of cell polygons with their point count;
+    empty cells are left out.
+    """
+    etag, last_modified = map_dataset_version()
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return set_validators(not_modified, etag, last_modified)
+
+    shape = request.GET.get("shape", "hex")
+    if shape not in DENSITY_GRIDS:
+        return Response(
+            {"detail": "Invalid shape, expected hex or square."}, status=400
+        )
+    try:
+        bbox_polygon = parse_bbox(request.GET["bbox"])
+    except (KeyError, TypeError, ValueError):
+        return Response(
+            {"detail": "Invalid bbox, expected minLon,minLat,maxLon,maxLat."},
+            status=400,
+        )
+    # A bbox across the antimeridian is gridded on each side of it
+    polygons = (
+        list(bbox_polygon)
+        if isinstance(bbox_polygon, MultiPolygon)
+        else [bbox_polygon]
+    )
+    try:
+        cell_size = density_cell_size(polygons, request.GET.get("size"))
+    except (TypeError, ValueError) as e:
+        return Response({"detail": str(e)}, status=400)
+
+    filters = Q()
+    species = request.GET.get("species")
+    if species:
+        filters &= species_filter(species)
+    for param, lookup in (
+        ("start_date", "observation_datetime__date__gte"),
+        ("end_date", "observation_datetime__date__lte"),
+    ):
+        value = request.GET.get(param)
+        if value:
+            try:
+                date = parse_date(value)
+            except ValueError:
+                date = None
+            if date is None:
+                return Response(
+                    {"detail": f"Invalid {param}, expected YYYY-MM-DD."},
+                    status=400,
+                )
+            filters &= Q(**{lookup: date})
+
+    cells = []
+    for polygon in polygons:
+        querysets = [
+            filter_bbox(model.objects.filter(filters), polygon)
+            for model in (Observation, CuratedObservation)
+        ]
+        cells.extend(
+            density_cells(querysets, polygon.extent, cell_size, shape)
+        )
+
+    response = Response({
+        "type": "FeatureCollection",
+        "shape": shape,
+        "cellSize": cell_size,
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": json.loads(cell["geometry"]),
+                "properties": {"count": cell["point_count"]},
+            }
+            for cell in cells
+        ],
+    })
+    return set_validators(response, etag, last_modified)
+
+
+def parse_feature_ids(value):
+    """
+    Parses "user-1,obis-2,..." into the list of requested feature ids, as
+    (source, pk) tuples, without duplicates. Raises ValueError on malformed
+    or unknown ids, or if more than MAP_MAX_DETAIL_IDS are requested.
+    """
+    feature_ids = []
+    for token in value.split(","):
+        source, _, pk = token.strip().partition("-")
+        if source not in ("user", "obis") or not pk.isdigit():
+            raise ValueError(f"Invalid feature id: {token}")
+        if (source, int(pk)) not in feature_ids:
+            feature_ids.append((source, int(pk)))
+    if len(feature_ids) > settings.MAP_MAX_DETAIL_IDS:
+        raise ValueError(
+            f"At most {settings.MAP_MAX_DETAIL_IDS} ids can be requested."
+        )
+    return feature_ids
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def map_feature_details(request):
+    """
+    Full properties of map features, fetched on demand by the client in thin
+    mode (e.g. when a point is clicked).
+    Params: ?ids=user-1,obis-2,...
+    Features come back in the requested order; unknown ids are omitted.
+    """
+    try:
+        feature_ids = parse_feature_ids(request.GET.get("ids", ""))
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=400)
+
+    return Response({
+        "type": "FeatureCollection",
+        "features": features_by_id(feature_ids),
+    })
+
+
+def features_by_id(feature_ids):
+    """
+    Full map features for the given (source, pk) ids, in the same order.
+    Ids that don't exist are left out.
+    """
+    sources = {
+        "user": (Observation.objects.all(), map_observation_features),
+        "obis": (
+            CuratedObservation.objects.all(),
+            map_curated_observation_features,
+        ),
+    }
+    features = {}
+    for source, (queryset, to_features) in sources.items():
+        pks = [pk for id_source, pk in feature_ids if id_source == source]
+        if pks:
+            for feature in to_features(queryset.filter(pk__in=pks)):
+                features[feature["id"]] = feature
+    return [
+        features[f"{source}-{pk}"]
+        for source, pk in feature_ids
+        if f"{source}-{pk}" in features
+    ]
+
+
+def species_filter(species):
+    """Matches observations by scientific or common name (case-insensitive)."""
+    return Q(species_name__iexact=species) | Q(common_name__iexact=species)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def map_nearest(request):
+    """
+    The k observations closest to a point, from both sources.
+    Params: ?lat=<latitude>&lng=<longitude>&k=<count>
+            &species=<scientific or common name>
+    Each source is ordered with the PostGIS KNN operator (<->), answered by
+    walking the GiST index, so the cost doesn't depend on how dense the data
+    is around the point. Features are ordered by distance, given in metres
+    in their "distance" property.
+    """
+    try:
+        point = Point(float(request.GET["lng"]), float(request.GET["lat"]))
+        if not (-180 <= point.x <= 180 and -90 <= point.y <= 90):
+            raise ValueError("Coordinates out of range.")
+    except (KeyError, TypeError, ValueError):
+        return Response({"detail": "Invalid latitude/longitude."}, status=400)
+    try:
+        k = int(request.GET.get("k", settings.MAP_NEAREST_DEFAULT_K))
+        if not 1 <= k <= settings.MAP_NEAREST_MAX_K:
+            raise ValueError
+    except (TypeError, ValueError):
+        return Response(
+            {
+                "detail": (
+                    f"k must be between 1 and {settings.MAP_NEAREST_MAX_K}."
+                )
+            },
+            status=400,
+        )
+
+    querysets = {
+        "user": Observation.objects.all(),
+        "obis": CuratedObservation.objects.all(),
+    }
+    species = request.GET.get("species")
+    if species:
+        querysets = {
+            source: queryset.filter(species_filter(species))
+            for source, queryset in querysets.items()
+        }
+
+    nearest = nearest_points(querysets, point, k)
+    features = features_by_id([(source, pk) for source, pk, _ in nearest])
+    distances = {
+        f"{source}-{pk}": distance for source, pk, distance in nearest
+    }
+    for feature in features:
+        feature["properties"]["distance"] = distances[feature["id"]]
+    return Response({"type": "FeatureCollection", "features": features})
+
+
+class MapTileView(APIView):
+    """
+    Mapbox Vector Tile of both observation sources for tile z/x/y, rendered
+    by PostGIS. Tiles below MAP_TILE_DETAIL_ZOOM only carry the properties
+    needed to draw points (id, source, species, date).
+    """
+
+    permission_classes = [IsAuthenticated]
+    content_negotiation_class = IgnoreClientContentNegotiation
+
+    def get(self, request, z, x, y):
+        if z > MAX_ZOOM or not (0 <= x < 2**z and 0 <= y < 2**z):
+            return Response(
+                {"detail": "Invalid tile coordinates."}, status=400
+            )
+
+        tile = render_tile(
+            z, x, y, detailed=z >= settings.MAP_TILE_DETAIL_ZOOM
+        )
+        response = HttpResponse(
+            tile,
+            content_type="application/vnd.mapbox-vector-tile",
+            status=200 if tile else 204,
+        )
+        response["Cache-Control"] = (
+            f"private, max-age={settings.MAP_TILE_MAX_AGE}"
+        )
+        return response
@@ -4,8 +4,10 @@ from django.conf import settings
 from django.contrib.gis.db import models as gis_models
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
+from django.contrib.postgres.indexes import GistIndex
 from django.core.validators import FileExtensionValidator
 from django.db import models
+from django.db.models.functions import Cast
 from PIL import Image
 
 from core.models import TimeStampedModel
@@ -82,6 +84,13 @@ class Observation(TimeStampedModel, models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Planar lon/lat bbox filters of the map (see map.queries)
+            GistIndex(
+                Cast("location", gis_models.PointField(srid=4326)),
+                name="observation_location_geom_gist",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if self.image and hasattr(self.image, "file"):
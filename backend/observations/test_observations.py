@@ -190,3 +190,24 @@ class ObservationAPITestCase(APITestCase):
         url = reverse("observation-validate", kwargs={"pk": 9999})
         response = self.client.post(url)
         self.assertEqual(response.status_code, 404)
+
+    def test_list_observations_conditional_get(self):
+        self.authenticate()
+        self.make_observation()
+        response = self.client.get(self.observations_url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        response = self.client.get(
+            self.observations_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        self.make_observation()
+        response = self.client.get(
+            self.observations_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
@@ -3,6 +3,13 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_gis.filters import InBBoxFilter
 
+from core.conditional import (
+    make_etag,
+    not_modified_response,
+    queryset_version,
+    set_validators,
+)
+
 from .models import Observation
 from .permissions import IsAdminOrResearcher, IsOwnerOrAdminOrResearcher
 from .serializers import ObservationGeoSerializer
@@ -27,6 +34,16 @@ class ObservationListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         return Observation.objects.filter(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        # Answer conditional GETs with 304 before running the list query
+        last_updated, count = queryset_version(self.get_queryset())
+        etag = make_etag("observations", request.user.pk, last_updated, count)
+        not_modified = not_modified_response(request, etag, last_updated)
+        if not_modified:
+            return set_validators(not_modified, etag, last_updated)
+        response = super().list(request, *args, **kwargs)
+        return set_validators(response, etag, last_updated)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import CuratedObservation
+from .models import CuratedObservation, EtlRun, WormsCommonName
 
 
 @admin.register(CuratedObservation)
@@ -64,4 +64,37 @@ class CuratedObservationAdmin(admin.ModelAdmin):
         "image",
         "user",
         "raw_data",
+        "content_hash",
     )
+
+
+@admin.register(EtlRun)
+class EtlRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "status",
+        "started_at",
+        "finished_at",
+        "data_changed_at",
+        "records_processed",
+        "new_records",
+        "updated_records",
+        "last_page",
+    )
+    list_filter = ("status",)
+    readonly_fields = list_display + (
+        "error",
+        "geometry",
+        "taxonid",
+        "start_date",
+        "end_date",
+        "upsert",
+        "cursor",
+    )
+
+
+@admin.register(WormsCommonName)
+class WormsCommonNameAdmin(admin.ModelAdmin):
+    list_display = ("aphia_id", "common_name", "fetched_at")
+    search_fields = ("common_name",)
+    readonly_fields = list_display
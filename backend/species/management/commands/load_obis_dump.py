@@ -0,0 +1,98 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from species.tasks.obis_dump import (
+    DUMP_FORMATS,
+    detect_dump_format,
+    load_obis_dump,
+)
+from species.tasks.obis_etl import worms_client
+from species.tasks.worms_cache import CachedWoRMSClient
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads a local OBIS occurrence export (NDJSON, CSV or Parquet) into"
+        " the curated observations, without querying the OBIS API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            type=str,
+            help=(
+                "Path of the export file. NDJSON and CSV files may be"
+                " gzipped (.gz)."
+            ),
+        )
+        parser.add_argument(
+            "--format",
+            type=str,
+            choices=DUMP_FORMATS,
+            default=None,
+            help=(
+                "Format of the export. Defaults to the one matching the file"
+                " extension (.ndjson/.jsonl, .csv, .parquet). Parquet requires"
+                " pyarrow (pip install pyarrow)."
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.OBIS_BULK_BATCH_SIZE,
+            help="Number of records read, transformed and written at once.",
+        )
+        parser.add_argument(
+            "--upsert",
+            action="store_true",
+            help=(
+                "Also rewrite stored records whose content changed, instead"
+                " of skipping every record already stored."
+            ),
+        )
+        parser.add_argument(
+            "--worms",
+            action="store_true",
+            help=(
+                "Query the WoRMS API for common names missing from the export"
+                " and from the WoRMS cache. By default, only cached names are"
+                " used and the command needs no network."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.is_file():
+            raise CommandError(f"File not found: {path}")
+        dump_format = options["format"] or detect_dump_format(path)
+        if dump_format is None:
+            raise CommandError(
+                f"Unknown format for {path}, pass one with --format."
+            )
+
+        worms = (
+            worms_client
+            if options["worms"]
+            else CachedWoRMSClient(None)  # Cache only, no WoRMS requests
+        )
+        self.stdout.write(f"Loading OBIS export {path}...")
+        try:
+            run = load_obis_dump(
+                path,
+                dump_format=dump_format,
+                batch_size=options["batch_size"],
+                upsert=options["upsert"],
+                worms=worms,
+            )
+        except ImportError as e:
+            raise CommandError(e)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Loaded OBIS export {path}: {run.records_processed} records"
+                f" read, {run.new_records} new, {run.updated_records}"
+                " updated."
+            )
+        )
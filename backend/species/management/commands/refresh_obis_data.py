@@ -4,6 +4,7 @@ from datetime import date, timedelta
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from species.models import EtlRun
 from species.tasks.obis_etl import trigger_full_obis_refresh
 
 
@@ -36,8 +37,9 @@ class Command(BaseCommand):
             help=(
                 "Maximum number of pages to fetch. For 'full' mode, this acts"
                 " as a limit if you don't want to fetch all available pages."
-                " For 'incremental' mode, it specifies the number of pages to"
-                " fetch."
+                " For 'incremental' mode, it is the page budget of a date"
+                " window: the date range is split into windows of at most"
+                " this many pages, which are all fetched."
             ),
             default=getattr(
                 settings, "OBIS_DEFAULT_FETCH_PAGES", None
@@ -72,6 +74,43 @@ class Command(BaseCommand):
             ),
         )
 
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            help="Number of pages fetched in parallel.",
+            default=settings.OBIS_FETCH_CONCURRENCY,
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            help=(
+                "Maximum OBIS API requests per second, across all fetching"
+                " threads (0 for no limit)."
+            ),
+            default=settings.OBIS_API_RATE_LIMIT,
+        )
+
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help=(
+                "Continue the most recent incomplete run with the same"
+                " geometry, taxon and date window from its last committed"
+                " page, instead of starting over. In incremental mode"
+                " without --start-date/--end-date, the window of the most"
+                " recent incomplete run is reused."
+            ),
+        )
+        parser.add_argument(
+            "--upsert",
+            action="store_true",
+            help=(
+                "Also rewrite stored records whose content changed on OBIS"
+                " (e.g. corrected coordinates, dates or names), instead of"
+                " skipping every record already stored."
+            ),
+        )
+
     def handle(self, *args, **options):
         geometry_wkt = options["geometry"]
         taxonid = options["taxonid"]
@@ -82,10 +121,24 @@ class Command(BaseCommand):
 
         final_start_date = None
         final_end_date = None
-        pages_to_pass_to_etl = None
+        pages_to_pass_to_etl = max_pages
+        window_pages = None
 
         if mode == "incremental":
             current_date = date.today()
+            interrupted_run = None
+            if options["resume"] and not (start_date_arg or end_date_arg):
+                # The default window moves every day: resume the interrupted
+                # run's window rather than looking for today's
+                interrupted_run = EtlRun.resumable_window(
+                    geometry_wkt, taxonid
+                )
+            if interrupted_run:
+                self.stdout.write(
+                    f"Resuming the window of ETL run {interrupted_run.pk}."
+                )
+                start_date_arg = interrupted_run.start_date.isoformat()
+                end_date_arg = interrupted_run.end_date.isoformat()
             if start_date_arg:
                 final_start_date = start_date_arg
             else:
@@ -98,12 +151,14 @@ class Command(BaseCommand):
             else:
                 # Default to today if incremental and end_date not specified
                 final_end_date = current_date.strftime("%Y-%m-%d")
-            # Calculate the specific page limit for incremental mode
-            pages_to_pass_to_etl = (
+            # In incremental mode, the page limit sizes the date windows;
+            # every window is fetched, so nothing is truncated
+            window_pages = (
                 max_pages
                 if max_pages is not None
                 else getattr(settings, "OBIS_DEFAULT_FETCH_PAGES", 1)
             )
+            pages_to_pass_to_etl = None
 
             self.stdout.write(
                 "Running in INCREMENTAL mode, fetching data with eventDate"
@@ -113,9 +168,8 @@ class Command(BaseCommand):
             self.stdout.write(
                 "Running in FULL REFRESH mode (no date filters applied)."
             )
-        # For full mode, the max_pages from options is passed directly.
-        # If --max-pages wasn't specified, this will be None, allowing full dynamic pagination.
-        pages_to_pass_to_etl = max_pages
+            # For full mode, the max_pages from options is passed directly.
+            # If --max-pages wasn't specified, this will be None, allowing full dynamic pagination.
 
         self.stdout.write(
             "Starting OBIS data refresh in a background thread..."
@@ -130,6 +184,13 @@ class Command(BaseCommand):
                 final_end_date,
                 pages_to_pass_to_etl,
             ),
+            kwargs={
+                "concurrency": options["concurrency"],
+                "rate": options["rate"],
+                "resume": options["resume"],
+                "window_pages": window_pages,
+                "upsert": options["upsert"],
+            },
         )
         etl_thread.start()
         etl_thread.join()
@@ -0,0 +1,40 @@
+# Generated by Django 5.0 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("species", "0004_curatedobservation_sex"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EtlRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "data_changed_at",
+                    models.DateTimeField(blank=True, null=True),
+                ),
+                (
+                    "records_processed",
+                    models.PositiveIntegerField(default=0),
+                ),
+                ("new_records", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["-started_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("species", "0005_etlrun"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WormsCommonName",
+            fields=[
+                (
+                    "aphia_id",
+                    models.PositiveIntegerField(
+                        primary_key=True, serialize=False
+                    ),
+                ),
+                (
+                    "common_name",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("fetched_at", models.DateTimeField()),
+            ],
+        ),
+    ]
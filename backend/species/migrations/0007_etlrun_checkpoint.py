@@ -0,0 +1,68 @@
+# Generated by Django 5.0 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+def mark_finished_runs_completed(apps, schema_editor):
+    EtlRun = apps.get_model("species", "EtlRun")
+    EtlRun.objects.filter(finished_at__isnull=False).update(status="completed")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("species", "0006_wormscommonname"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="etlrun",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("running", "Running"),
+                    ("completed", "Completed"),
+                    ("failed", "Failed"),
+                ],
+                default="running",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="etlrun",
+            name="error",
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="etlrun",
+            name="geometry",
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="etlrun",
+            name="taxonid",
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name="etlrun",
+            name="start_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="etlrun",
+            name="end_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="etlrun",
+            name="last_page",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="etlrun",
+            name="cursor",
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(
+            mark_finished_runs_completed, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0 on 2026-10-18 15:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("species", "0007_etlrun_checkpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="etlrun",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="tiles",
+                to="species.etlrun",
+            ),
+        ),
+    ]
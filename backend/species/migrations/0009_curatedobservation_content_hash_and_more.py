@@ -0,0 +1,27 @@
+# Generated by Django 5.0 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("species", "0008_etlrun_parent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="curatedobservation",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="etlrun",
+            name="updated_records",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="etlrun",
+            name="upsert",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0 on 2026-10-18 17:05
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("species", "0009_curatedobservation_content_hash_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="curatedobservation",
+            index=django.contrib.postgres.indexes.GistIndex(
+                django.db.models.functions.comparison.Cast(
+                    "location",
+                    django.contrib.gis.db.models.fields.PointField(srid=4326),
+                ),
+                name="curatedobs_location_geom_gist",
+            ),
+        ),
+    ]
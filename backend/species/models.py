@@ -1,4 +1,7 @@
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GistIndex
+from django.db.models import Max
+from django.db.models.functions import Cast
 
 
 class CuratedObservation(models.Model):
@@ -52,10 +55,137 @@ class CuratedObservation(models.Model):
 
     # Raw API data
     raw_data = models.JSONField(blank=True, null=True)
+    # SHA-256 of the curated fields, to detect changed records on upserts
+    content_hash = models.CharField(max_length=64, blank=True, null=True)
 
     class Meta:
         unique_together = ("obis_id", "source")
         ordering = ["-observation_date"]
+        indexes = [
+            # Planar lon/lat bbox filters of the map (see map.queries)
+            GistIndex(
+                Cast("location", models.PointField(srid=4326)),
+                name="curatedobs_location_geom_gist",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.species_name} ({self.common_name or 'No common name'})"
+
+
+class EtlRun(models.Model):
+    """
+    One run of the OBIS ETL. The latest `data_changed_at` across runs is the
+    watermark of the curated dataset, used to version map responses.
+    A run also records its query parameters and a checkpoint (last committed
+    page and record id), so that an interrupted refresh can be resumed.
+    Refreshes split into tiles or date windows have one child run per part.
+    """
+
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Last time this run committed new records
+    data_changed_at = models.DateTimeField(blank=True, null=True)
+    records_processed = models.PositiveIntegerField(default=0)
+    new_records = models.PositiveIntegerField(default=0)
+    updated_records = models.PositiveIntegerField(default=0)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_RUNNING
+    )
+    error = models.TextField(blank=True, null=True)
+
+    # Query parameters
+    geometry = models.TextField(blank=True, null=True)
+    taxonid = models.CharField(max_length=50, blank=True, null=True)
+    start_date = models.DateField(blank=True, null=True)
+    end_date = models.DateField(blank=True, null=True)
+    # Rewrite stored records whose content changed, instead of skipping them
+    upsert = models.BooleanField(default=False)
+
+    # Run of the whole refresh, when this run covers one of its tiles or
+    # date windows
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.CASCADE,
+        related_name="tiles",
+        blank=True,
+        null=True,
+    )
+
+    # Checkpoint: last committed page, and id of its last OBIS record (the
+    # `after` cursor of the next page)
+    last_page = models.IntegerField(blank=True, null=True)
+    cursor = models.CharField(max_length=100, blank=True, null=True)
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def __str__(self):
+        return f"OBIS ETL run {self.pk} started {self.started_at}"
+
+    @classmethod
+    def resumable(cls, geometry, taxonid, start_date, end_date):
+        """
+        Most recent run with the same parameters that did not complete, or
+        None.
+        """
+        return (
+            cls.objects.exclude(status=cls.STATUS_COMPLETED)
+            .filter(
+                parent__isnull=True,
+                geometry=geometry,
+                taxonid=taxonid,
+                start_date=start_date,
+                end_date=end_date,
+            )
+            .first()
+        )
+
+    @classmethod
+    def resumable_window(cls, geometry, taxonid):
+        """
+        Most recent date-range run with the same geometry and taxon that did
+        not complete, whatever its window, or None. Lets a run with a
+        default (relative) window be resumed on a later day.
+        """
+        return (
+            cls.objects.exclude(status=cls.STATUS_COMPLETED)
+            .filter(
+                parent__isnull=True,
+                geometry=geometry,
+                taxonid=taxonid,
+                start_date__isnull=False,
+                end_date__isnull=False,
+            )
+            .first()
+        )
+
+    @classmethod
+    def watermark(cls):
+        """Last time any ETL run changed CuratedObservation, or None."""
+        return cls.objects.aggregate(watermark=Max("data_changed_at"))[
+            "watermark"
+        ]
+
+
+class WormsCommonName(models.Model):
+    """
+    Cached WoRMS English common name of an AphiaID, used by the OBIS ETL.
+    A null `common_name` records that WoRMS has no English name for it.
+    """
+
+    aphia_id = models.PositiveIntegerField(primary_key=True)
+    common_name = models.CharField(max_length=255, blank=True, null=True)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.aphia_id}: {self.common_name or 'No common name'}"
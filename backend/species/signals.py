@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent by species.tasks.obis_etl (and obis_dump) once a refresh (or the load
+# of an export) has stored all its pages.
+# Provides the EtlRun as `run`.
+obis_refresh_finished = Signal()
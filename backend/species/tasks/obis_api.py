@@ -2,6 +2,8 @@ import json
 
 import requests
 
+from .utils.http import build_session
+
 
 class OBISAPIClient:
     def __init__(
@@ -9,10 +11,16 @@ class OBISAPIClient:
         base_url="https://api.obis.org/v3/",
         default_size=500,
         logger=None,
+        session=None,
     ):
+        """
+        :param session: requests.Session to use; defaults to a pooled session
+                        with retries (see build_session).
+        """
         self.base_url = base_url
         self.default_size = default_size
         self.logger = logger or self._get_default_logger()
+        self.session = session or build_session()
 
     def _get_default_logger(self):
         import logging
@@ -28,6 +36,8 @@ class OBISAPIClient:
         page=0,
         start_date=None,
         end_date=None,
+        after=None,
+        raise_errors=False,
     ):
         """
         Fetches occurrence data from OBIS API.
@@ -37,14 +47,25 @@ class OBISAPIClient:
         :param page: Page number (for pagination)
         :param start_date: Date string (YYYY-MM-DD) to fetch records with eventDate >= this.
         :param end_date: Date string (YYYY-MM-DD) to fetch records with eventDate <= this.
+        :param after: Id of the last record of the previous page. When given,
+                      the page is the one following that record (keyset
+                      pagination) and `page` is ignored.
+        :param raise_errors: Re-raise request and decoding errors (once the
+                             session's retries are exhausted) instead of
+                             returning an empty page, which a caller paging
+                             through results cannot tell from the end of
+                             the data.
         :return: Tuple (list of occurrence records, total count of records)
         """
         endpoint = f"{self.base_url}occurrence"
         params = {
             "geometry": geometry,
             "size": size or self.default_size,
-            "offset": page * (size or self.default_size),
         }
+        if after:
+            params["after"] = after
+        else:
+            params["offset"] = page * (size or self.default_size)
         if taxonid:
             params["taxonid"] = taxonid
         if start_date:
@@ -56,14 +77,18 @@ class OBISAPIClient:
             f"Fetching OBIS data from {endpoint} with params: {params}"
         )
         try:
-            response = requests.get(endpoint, params=params, timeout=30)
+            response = self.session.get(endpoint, params=params, timeout=30)
             response.raise_for_status()
             data = response.json()
             total_count = data.get("total", 0)
             return data.get("results", []), total_count
         except requests.exceptions.RequestException as e:
             self.logger.error(f"OBIS API request failed: {e}")
+            if raise_errors:
+                raise
             return [], 0
         except json.JSONDecodeError:
             self.logger.error("Failed to decode JSON response from OBIS API.")
+            if raise_errors:
+                raise
             return [], 0
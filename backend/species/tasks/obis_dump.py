@@ -0,0 +1,182 @@
+import csv
+import gzip
+import json
+import logging
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+
+from species.models import EtlRun
+from species.signals import obis_refresh_finished
+
+from .obis_etl import (
+    finish_run,
+    load_obis_page,
+    mark_run_failed,
+    transform_obis_page,
+)
+from .utils.pipeline import prefetch
+
+logger = logging.getLogger(__name__)
+
+DUMP_FORMATS = ("ndjson", "csv", "parquet")
+DUMP_SUFFIXES = {
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+    ".parquet": "parquet",
+}
+
+
+def detect_dump_format(path):
+    """
+    Format of an OBIS export, from its file name (a trailing .gz is
+    ignored), or None if it is not recognized.
+    """
+    suffixes = [suffix.lower() for suffix in Path(path).suffixes]
+    if suffixes and suffixes[-1] == ".gz":
+        suffixes.pop()
+    return DUMP_SUFFIXES.get(suffixes[-1]) if suffixes else None
+
+
+def open_text(path):
+    """Opens a text file, decompressing it if its name ends with .gz."""
+    if str(path).lower().endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def read_ndjson(path):
+    """Yields the records of a newline-delimited JSON file, one per line."""
+    with open_text(path) as dump:
+        for line_num, line in enumerate(dump, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(
+                    f"Skipping invalid JSON on line {line_num}: {e}"
+                )
+
+
+def read_csv(path):
+    """
+    Yields the rows of a CSV file with a header row, as dicts; empty cells
+    are None.
+    """
+    with open_text(path) as dump:
+        for row in csv.DictReader(dump):
+            yield {
+                column: value if value != "" else None
+                for column, value in row.items()
+            }
+
+
+def read_parquet(path, batch_size):
+    """
+    Iterates the rows of a Parquet file, reading `batch_size` rows at a
+    time. Requires pyarrow, an optional dependency.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError(
+            "Reading Parquet files requires pyarrow, an optional dependency"
+            " (pip install pyarrow)."
+        )
+
+    def rows(parquet_file):
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            for row in batch.to_pylist():
+                # Typed columns come back as dates; the transforms (and
+                # raw_data) expect JSON values, as returned by the API
+                yield {
+                    column: (
+                        value.isoformat()
+                        if isinstance(value, (date, datetime))
+                        else value
+                    )
+                    for column, value in row.items()
+                }
+
+    return rows(pq.ParquetFile(path))
+
+
+def read_obis_dump(path, dump_format=None, batch_size=None):
+    """
+    Streams the occurrence records of a local OBIS export, without loading
+    the whole file in memory.
+    :param dump_format: "ndjson", "csv" or "parquet" (default: from the
+                        file name).
+    :return: Iterator of record dicts, keyed like OBIS API results.
+    """
+    dump_format = dump_format or detect_dump_format(path)
+    if dump_format == "ndjson":
+        return read_ndjson(path)
+    if dump_format == "csv":
+        return read_csv(path)
+    if dump_format == "parquet":
+        return read_parquet(path, batch_size or settings.OBIS_BULK_BATCH_SIZE)
+    raise ValueError(
+        f"Unknown OBIS export format for {path}, expected one of"
+        f" {', '.join(DUMP_FORMATS)}."
+    )
+
+
+def load_obis_dump(
+    path, dump_format=None, batch_size=None, upsert=False, worms=None
+):
+    """
+    Loads a local OBIS export through the same transforms and bulk writes as
+    API refreshes: records are read in batches of `batch_size`
+    (default: OBIS_BULK_BATCH_SIZE), transformed in a background thread and
+    written one batch per transaction, so memory stays bounded whatever the
+    size of the file. The load is tracked by an EtlRun, checkpointed after
+    every batch.
+    :param dump_format: "ndjson", "csv" or "parquet" (default: from the
+                        file name).
+    :param upsert: Rewrite the stored records whose content changed, instead
+                   of skipping them.
+    :param worms: WoRMS client used for common names (default: worms_client).
+    :return: The completed EtlRun.
+    """
+    batch_size = batch_size or settings.OBIS_BULK_BATCH_SIZE
+    records = read_obis_dump(path, dump_format, batch_size)
+    batches = iter(lambda: list(islice(records, batch_size)), [])
+    transformed_batches = (
+        (
+            batch[-1].get("id"),
+            len(batch),
+            transform_obis_page(batch, upsert, worms),
+        )
+        for batch in batches
+    )
+
+    run = EtlRun.objects.create(upsert=upsert)
+    try:
+        for batch_num, (cursor, records_processed, observations) in enumerate(
+            prefetch(transformed_batches, settings.OBIS_PIPELINE_QUEUE_SIZE)
+        ):
+            load_obis_page(
+                observations,
+                records_processed,
+                batch_num,
+                run,
+                cursor,
+                upsert=upsert,
+            )
+            logger.info(
+                f"Loaded batch {batch_num + 1}: {run.records_processed}"
+                f" records read, {run.new_records} new,"
+                f" {run.updated_records} updated."
+            )
+    except Exception as e:
+        mark_run_failed(run, e)
+        raise
+    finish_run(run)
+    obis_refresh_finished.send(sender=EtlRun, run=run)
+    return run
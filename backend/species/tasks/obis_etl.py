@@ -1,11 +1,26 @@
+import hashlib
+import json
 import logging
-import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from itertools import islice
 
 from django.conf import settings
-from django.contrib.gis.geos import Point
-from django.db import transaction
+from django.contrib.gis.geos import (
+    GEOSGeometry,
+    MultiPolygon,
+    Point,
+    Polygon,
+)
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.constants import OnConflict
+from django.db.models.sql import InsertQuery
+from django.utils import timezone
 
-from species.models import CuratedObservation
+from species.models import CuratedObservation, EtlRun
+from species.signals import obis_refresh_finished
 
 from .obis_api import OBISAPIClient
 from .utils.etl_cleaning import (
@@ -16,32 +31,432 @@ from .utils.etl_cleaning import (
     standardize_sex,
     to_float,
 )
+from .utils.http import build_session, resize_pool
+from .utils.pipeline import prefetch
+from .utils.rate_limiter import TokenBucket
 from .worms_api import WoRMSAPIClient
+from .worms_cache import CachedWoRMSClient
 
 logger = logging.getLogger(__name__)
 
+MULTI_GEOMETRIES = ("MultiPolygon", "GeometryCollection")
+# Fields left out of CuratedObservation content hashes. common_name comes
+# from WoRMS when the record has no vernacularName, so a failed lookup must
+# not count as a change: the record's own vernacularName is hashed instead.
+UNHASHED_FIELDS = ("id", "raw_data", "content_hash", "common_name")
+
 obis_client = OBISAPIClient(
     base_url=getattr(
         settings, "OBIS_API_BASE_URL", "https://api.obis.org/v3/"
     ),
     default_size=getattr(settings, "OBIS_API_DEFAULT_SIZE", 500),
     logger=logger,
-)
-worms_client = WoRMSAPIClient(
-    base_url=getattr(
-        settings, "WORMS_API_BASE_URL", "https://www.marinespecies.org/rest/"
+    session=build_session(
+        pool_size=settings.OBIS_FETCH_CONCURRENCY,
+        retries=settings.HTTP_MAX_RETRIES,
+        backoff_factor=settings.HTTP_BACKOFF_FACTOR,
     ),
-    logger=logger,
 )
+worms_client = CachedWoRMSClient(
+    WoRMSAPIClient(
+        base_url=getattr(
+            settings,
+            "WORMS_API_BASE_URL",
+            "https://www.marinespecies.org/rest/",
+        ),
+        logger=logger,
+        session=build_session(
+            pool_size=settings.WORMS_LOOKUP_CONCURRENCY,
+            retries=settings.HTTP_MAX_RETRIES,
+            backoff_factor=settings.HTTP_BACKOFF_FACTOR,
+        ),
+    )
+)
+
+
+def record_etl_page(
+    run,
+    records_processed,
+    new_records,
+    page=None,
+    cursor=None,
+    updated_records=0,
+):
+    """
+    Adds a committed page to the counters of `run` and checkpoints it. Pages
+    that wrote new or updated records move the curated dataset watermark
+    (see EtlRun.watermark); a page stored outside of any run is recorded as
+    a run of its own.
+    :param page: Page number, saved as the run's last committed page.
+    :param cursor: Id of the page's last OBIS record.
+    :param updated_records: Number of stored records the page rewrote.
+    """
+    now = timezone.now()
+    if run is None:
+        if new_records or updated_records:
+            EtlRun.objects.create(
+                finished_at=now,
+                data_changed_at=now,
+                records_processed=records_processed,
+                new_records=new_records,
+                updated_records=updated_records,
+                status=EtlRun.STATUS_COMPLETED,
+            )
+        return
+    run.records_processed += records_processed
+    run.new_records += new_records
+    run.updated_records += updated_records
+    if new_records or updated_records:
+        run.data_changed_at = now
+    if page is not None:
+        run.last_page = page
+        run.cursor = cursor
+    run.save(
+        update_fields=[
+            "records_processed",
+            "new_records",
+            "updated_records",
+            "data_changed_at",
+            "last_page",
+            "cursor",
+        ]
+    )
+
+
+def observation_content_hash(observation):
+    """
+    Stable SHA-256 of the curated (normalized) fields of an observation, so
+    that records re-fetched with the same content hash the same. raw_data is
+    left out: changes that do not reach the curated fields are ignored.
+    Only fields that come from the OBIS record are hashed, not the WoRMS
+    common name.
+    :return: Hex digest string.
+    """
+    content = {
+        "vernacularName": (observation.raw_data or {}).get("vernacularName")
+    }
+    for field in CuratedObservation._meta.concrete_fields:
+        if field.name in UNHASHED_FIELDS:
+            continue
+        value = field.value_from_object(observation)
+        if field.name == "location" and value is not None:
+            value = value.coords
+        content[field.name] = value
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def build_curated_observation(obs, worms=None):
+    """
+    Transforms one OBIS occurrence record into an unsaved CuratedObservation,
+    enriched with its WoRMS common name.
+    :param worms: WoRMS client used for common names (default: worms_client),
+                  or the ResolvedCommonNames of the record's page.
+    :return: The instance, or None if the record lacks an id or coordinates.
+    """
+    obis_id = obs.get("id")
+    if not obis_id:
+        logger.warning(
+            "OBIS record missing 'id' field, skipping entire"
+            f" record due to missing key: {obs}"
+        )
+        return None
+
+    lon = obs.get("decimalLongitude")
+    lat = obs.get("decimalLatitude")
+    if lon is None or lat is None:
+        logger.warning(
+            f"OBIS record {obis_id} missing coordinates, skipping"
+            " entire record."
+        )
+        return None
+
+    common_name = get_harmonized_common_name(
+        obs, worms_client if worms is None else worms
+    )
+
+    event_date_str = obs.get("eventDate")
+    observation_datetime, observation_date = parse_obis_event_date(
+        obis_id, event_date_str
+    )
+
+    machine_observation_raw = obs.get("basisOfRecord")
+    machine_observation = clean_string_to_capital_capital(
+        machine_observation_raw
+    )
+
+    # Call normalize_obis_depth to get the three depth fields
+    depth_min, depth_max, bathymetry = normalize_obis_depth(obs)
+
+    temperature_raw = obs.get("sst")
+    temperature = to_float(temperature_raw)  # Use to_float for robustness
+    if (
+        temperature is None and temperature_raw is not None
+    ):  # Log only if value was present but invalid
+        logger.warning(
+            f"OBIS record {obis_id}: Invalid 'sst' value"
+            f" '{temperature_raw}', temperature set to None."
+        )
+
+    # New 'sex' field processing
+    raw_sex = obs.get("sex")
+    sex = standardize_sex(raw_sex)
+
+    observation = CuratedObservation(
+        obis_id=obis_id,
+        species_name=obs.get("scientificName") or "Unknown species",
+        common_name=common_name,
+        observation_date=observation_date,
+        observation_datetime=observation_datetime,
+        location=Point(float(lon), float(lat)),
+        location_name=obs.get("datasetName") or "OBIS record",
+        machine_observation=machine_observation,
+        validated="validated",
+        source="OBIS",
+        depth_min=depth_min,
+        depth_max=depth_max,
+        bathymetry=bathymetry,
+        temperature=temperature,
+        visibility=None,
+        notes=(
+            "Imported from OBIS dataset:"
+            f" {obs.get('datasetName') or 'Unknown'}"
+        ),
+        image=None,
+        user=None,
+        sex=sex,
+        raw_data=obs,
+    )
+    observation.content_hash = observation_content_hash(observation)
+    return observation
+
+
+def find_existing_obis_ids(obis_ids):
+    """
+    The given OBIS ids that are already stored, looked up through the unique
+    obis_id index.
+    """
+    obis_ids = set(obis_ids) - {None}
+    if not obis_ids:
+        return set()
+    return set(
+        CuratedObservation.objects.filter(obis_id__in=obis_ids).values_list(
+            "obis_id", flat=True
+        )
+    )
+
+
+def transform_obis_page(obis_records, upsert=False, worms=None):
+    """
+    Builds unsaved CuratedObservations for the records of a page that are
+    not stored yet (each id once), enriching them with WoRMS.
+    :param upsert: Build the stored records as well, to be upserted.
+    :param worms: WoRMS client used for common names (default: worms_client).
+    """
+    worms = worms or worms_client
+    if upsert:
+        existing_obis_ids = set()
+    else:
+        existing_obis_ids = find_existing_obis_ids(
+            obs.get("id") for obs in obis_records
+        )
+
+    # Resolve the page's distinct AphiaIDs concurrently up front, and build
+    # the records from the result only: a failed lookup is not retried for
+    # every record that shares its AphiaID
+    common_names = worms.resolve_many(
+        obs.get("aphiaID")
+        for obs in obis_records
+        if obs.get("id") not in existing_obis_ids
+        and not obs.get("vernacularName")
+    )
+
+    new_observations = []
+    for obs in obis_records:
+        obis_id = obs.get("id")
+        if obis_id in existing_obis_ids:
+            logger.debug(f"Skipping duplicate OBIS record with ID: {obis_id}")
+            continue
+        observation = build_curated_observation(obs, common_names)
+        if observation is not None:
+            new_observations.append(observation)
+            existing_obis_ids.add(obis_id)
+    return new_observations
+
+
+def insert_observations(observations):
+    """
+    Inserts the observations in batches of OBIS_BULK_BATCH_SIZE, with
+    INSERT ... ON CONFLICT (obis_id) DO NOTHING: ids stored meanwhile (e.g.
+    by a concurrent refresh) are skipped.
+    :param observations: Unsaved CuratedObservations, each obis_id once.
+    :return: Number of rows inserted.
+    """
+    opts = CuratedObservation._meta
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+
+    inserted = 0
+    observations = iter(observations)
+    while batch := list(islice(observations, settings.OBIS_BULK_BATCH_SIZE)):
+        query = InsertQuery(CuratedObservation, on_conflict=OnConflict.IGNORE)
+        query.insert_values(fields, batch)
+        ((sql, params),) = query.get_compiler(connection=connection).as_sql()
+        # Only the inserted rows are returned, not the conflicting ones
+        sql += " RETURNING 1"
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(sql, params)
+            inserted += len(db_cursor.fetchall())
+    return inserted
+
+
+def upsert_observations(observations):
+    """
+    Inserts the observations, and rewrites the stored ones whose content
+    hash changed, with INSERT ... ON CONFLICT (obis_id) DO UPDATE ... WHERE:
+    rows with an unchanged hash are not rewritten, so re-syncing an area
+    leaves no dead row versions behind. A rewritten row keeps its stored
+    common_name when the incoming one is NULL (e.g. a failed WoRMS lookup).
+    :param observations: Unsaved CuratedObservations, each obis_id once.
+    :return: Tuple (number of rows inserted, number of rows updated)
+    """
+    opts = CuratedObservation._meta
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+    obis_id_field = opts.get_field("obis_id")
+    common_name_field = opts.get_field("common_name")
+    update_fields = [
+        field
+        for field in fields
+        if field not in (obis_id_field, common_name_field)
+    ]
+    table = connection.ops.quote_name(opts.db_table)
+    common_name = connection.ops.quote_name(common_name_field.column)
+
+    inserted = updated = 0
+    observations = iter(observations)
+    while batch := list(islice(observations, settings.OBIS_BULK_BATCH_SIZE)):
+        query = InsertQuery(
+            CuratedObservation,
+            on_conflict=OnConflict.UPDATE,
+            update_fields=update_fields,
+            unique_fields=[obis_id_field],
+        )
+        query.insert_values(fields, batch)
+        ((sql, params),) = query.get_compiler(connection=connection).as_sql()
+        # xmax is 0 for freshly inserted rows; skipped rows are not returned
+        sql += (
+            f", {common_name} = COALESCE(EXCLUDED.{common_name},"
+            f" {table}.{common_name})"
+            f" WHERE {table}.content_hash IS DISTINCT FROM"
+            " EXCLUDED.content_hash RETURNING (xmax = 0)"
+        )
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(sql, params)
+            for (was_inserted,) in db_cursor.fetchall():
+                if was_inserted:
+                    inserted += 1
+                else:
+                    updated += 1
+    return inserted, updated
+
+
+def load_obis_page(
+    observations,
+    records_processed,
+    page=0,
+    run=None,
+    cursor=None,
+    upsert=False,
+):
+    """
+    Writes the observations built from a page to the DB in a single
+    transaction, together with the run's checkpoint. Ids stored since the
+    page was transformed (e.g. by the previous page of a pipeline) are
+    skipped.
+    :param records_processed: Number of OBIS records of the page.
+    :param page: Page number.
+    :param run: EtlRun the page belongs to, if any.
+    :param cursor: Id of the page's last OBIS record.
+    :param upsert: Rewrite the stored records whose content changed instead
+                   of skipping them (see upsert_observations).
+    :return: Number of new records written.
+    """
+    if upsert:
+        with transaction.atomic():
+            try:
+                new_records_count, updated_count = upsert_observations(
+                    observations
+                )
+            except Exception as e:
+                logger.error(
+                    f"Failed to upsert OBIS page {page}: {e}",
+                    exc_info=True,
+                )
+                raise
+            record_etl_page(
+                run,
+                records_processed,
+                new_records_count,
+                page,
+                cursor,
+                updated_records=updated_count,
+            )
+        return new_records_count
+
+    existing_obis_ids = find_existing_obis_ids(
+        observation.obis_id for observation in observations
+    )
+    new_observations = [
+        observation
+        for observation in observations
+        if observation.obis_id not in existing_obis_ids
+    ]
+
+    with transaction.atomic():
+        try:
+            new_records_count = insert_observations(new_observations)
+        except Exception as e:
+            logger.error(
+                f"Failed to save OBIS page {page}: {e}",
+                exc_info=True,
+            )
+            raise
+        record_etl_page(
+            run, records_processed, new_records_count, page, cursor
+        )
+    return new_records_count
+
+
+def store_obis_page(obis_records, page=0, run=None, upsert=False):
+    """
+    Enriches a fetched page of OBIS records and writes the new ones to the
+    DB in a single transaction.
+    :param upsert: Rewrite the stored records whose content changed too.
+    :return: Number of new records written.
+    """
+    return load_obis_page(
+        transform_obis_page(obis_records, upsert),
+        len(obis_records),
+        page,
+        run,
+        cursor=obis_records[-1].get("id") if obis_records else None,
+        upsert=upsert,
+    )
 
 
 def fetch_and_store_obis_data(
-    geometry_wkt, taxonid=None, page=0, start_date=None, end_date=None
+    geometry_wkt,
+    taxonid=None,
+    page=0,
+    start_date=None,
+    end_date=None,
+    run=None,
 ):
     """
     Function to fetch a batch of OBIS data, enrich it, and store in the DB.
     :param start_date: Date string (YYYY-MM-DD) for fetching records.
     :param end_date: Date string (YYYY-MM-DD) for fetching records.
+    :param run: EtlRun the page belongs to, if any.
     """
     logger.info(
         f"Starting OBIS ETL for geometry: {geometry_wkt}, taxonid: {taxonid},"
@@ -70,112 +485,7 @@ def fetch_and_store_obis_data(
                 "page": page,
             }
 
-        new_records_count = 0
-
-        existing_obis_ids = set(
-            CuratedObservation.objects.values_list("obis_id", flat=True)
-        )
-
-        with transaction.atomic():
-            for obs in obis_records:
-                obis_id = obs.get("id")
-                if not obis_id:
-                    logger.warning(
-                        "OBIS record missing 'id' field, skipping entire"
-                        f" record due to missing key: {obs}"
-                    )
-                    continue
-
-                if obis_id in existing_obis_ids:
-                    logger.debug(
-                        f"Skipping duplicate OBIS record with ID: {obis_id}"
-                    )
-                    continue
-
-                lon = obs.get("decimalLongitude")
-                lat = obs.get("decimalLatitude")
-                if lon is None or lat is None:
-                    logger.warning(
-                        f"OBIS record {obis_id} missing coordinates, skipping"
-                        " entire record."
-                    )
-                    continue
-
-                common_name = get_harmonized_common_name(obs, worms_client)
-
-                event_date_str = obs.get("eventDate")
-                observation_datetime, observation_date = parse_obis_event_date(
-                    obis_id, event_date_str
-                )
-
-                machine_observation_raw = obs.get("basisOfRecord")
-                machine_observation = clean_string_to_capital_capital(
-                    machine_observation_raw
-                )
-
-                # Call normalize_obis_depth to get the three depth fields
-                depth_min, depth_max, bathymetry = normalize_obis_depth(obs)
-
-                temperature_raw = obs.get("sst")
-                temperature = to_float(
-                    temperature_raw
-                )  # Use to_float for robustness
-                if (
-                    temperature is None and temperature_raw is not None
-                ):  # Log only if value was present but invalid
-                    logger.warning(
-                        f"OBIS record {obis_id}: Invalid 'sst' value"
-                        f" '{temperature_raw}', temperature set to None."
-                    )
-
-                visibility = None
-                notes = (
-                    "Imported from OBIS dataset:"
-                    f" {obs.get('datasetName') or 'Unknown'}"
-                )
-                image = None
-                user = None
-                validated = "validated"
-
-                # New 'sex' field processing
-                raw_sex = obs.get("sex")
-                sex = standardize_sex(raw_sex)
-
-                try:
-                    CuratedObservation.objects.create(
-                        obis_id=obis_id,
-                        species_name=obs.get("scientificName")
-                        or "Unknown species",
-                        common_name=common_name,
-                        observation_date=observation_date,
-                        observation_datetime=observation_datetime,
-                        location=Point(float(lon), float(lat)),
-                        location_name=obs.get("datasetName") or "OBIS record",
-                        machine_observation=machine_observation,
-                        validated=validated,
-                        source="OBIS",
-                        depth_min=depth_min,
-                        depth_max=depth_max,
-                        bathymetry=bathymetry,
-                        temperature=temperature,
-                        visibility=visibility,
-                        notes=notes,
-                        image=image,
-                        user=user,
-                        sex=sex,
-                        raw_data=obs,
-                    )
-                    new_records_count += 1
-                    logger.debug(
-                        f"Saved new record: {obis_id} -"
-                        f" {obs.get('scientificName')}"
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"Failed to save OBIS record {obis_id}: {e}",
-                        exc_info=True,
-                    )  # Added exc_info=True for full traceback in logs
-                    raise
+        new_records_count = store_obis_page(obis_records, page, run)
 
         logger.info(
             f"Finished OBIS ETL for page {page}. Processed"
@@ -198,21 +508,186 @@ def fetch_and_store_obis_data(
         raise
 
 
-# The trigger_full_obis_refresh function follows here, no changes needed for its logic.
+def fetch_in_order(fetch, pages, concurrency):
+    """
+    Runs fetch(page) for each page on a pool of `concurrency` threads and
+    yields (page, result) in page order. At most 2 * concurrency pages are
+    fetched ahead of the consumer, so memory stays bounded.
+    """
+    pages = iter(pages)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque(
+            (page, executor.submit(fetch, page))
+            for page in islice(pages, 2 * concurrency)
+        )
+        try:
+            while pending:
+                page, future = pending.popleft()
+                for next_page in islice(pages, 1):
+                    pending.append(
+                        (next_page, executor.submit(fetch, next_page))
+                    )
+                yield page, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def fetch_by_cursor(fetch_after, total_pages, first_page=0, after=None):
+    """
+    Walks pages up to `total_pages` with the OBIS `after` cursor, each page
+    starting after the last record id of the previous one.
+    :param fetch_after: Function fetching the page after a record id
+                        (None for the first page).
+    :param first_page: Number of the first page, following record `after`
+                       (when resuming a run).
+    :return: Generator of (page number, records).
+    """
+    for page_num in range(first_page, total_pages):
+        obis_records = fetch_after(after)
+        yield page_num, obis_records
+        if not obis_records:
+            return
+        after = obis_records[-1].get("id")
+        if not after:
+            logger.error(
+                f"Last OBIS record of page {page_num} has no id, cannot"
+                " fetch the following pages."
+            )
+            return
+
+
+def shard_geometry(geometry_wkt, count_records, threshold, total=None):
+    """
+    Splits a geometry into tiles holding at most `threshold` OBIS records
+    each: a tile over the threshold is split into the four quadrants of its
+    bounding box (clipped to the tile), recursively. Tiles narrower than
+    OBIS_SHARD_MIN_SIZE degrees are not split further.
+    :param count_records: Function returning the number of records of a WKT
+                          geometry; it must raise if the count fails, as 0
+                          drops the tile.
+    :param total: Record count of `geometry_wkt`, if already known.
+    :return: List of (tile WKT, record count); empty tiles are left out.
+    """
+    if total is None:
+        total = count_records(geometry_wkt)
+    if not total:
+        return []
+    geometry = GEOSGeometry(geometry_wkt)
+    min_lon, min_lat, max_lon, max_lat = geometry.extent
+    mid_lon, mid_lat = (min_lon + max_lon) / 2, (min_lat + max_lat) / 2
+    too_small = (
+        max_lon - mid_lon < settings.OBIS_SHARD_MIN_SIZE
+        and max_lat - mid_lat < settings.OBIS_SHARD_MIN_SIZE
+    )
+    if total <= threshold or too_small:
+        return [(geometry_wkt, total)]
+
+    tiles = []
+    for bbox in (
+        (min_lon, min_lat, mid_lon, mid_lat),
+        (mid_lon, min_lat, max_lon, mid_lat),
+        (min_lon, mid_lat, mid_lon, max_lat),
+        (mid_lon, mid_lat, max_lon, max_lat),
+    ):
+        tile = geometry.intersection(Polygon.from_bbox(bbox))
+        # Drop the lines/points left where the geometry touches the quadrant
+        polygons = [
+            part
+            for part in (
+                tile if tile.geom_type in MULTI_GEOMETRIES else [tile]
+            )
+            if part.geom_type == "Polygon" and part.area > 0
+        ]
+        if not polygons:
+            continue
+        tile = polygons[0] if len(polygons) == 1 else MultiPolygon(polygons)
+        tiles.extend(shard_geometry(tile.wkt, count_records, threshold))
+    return tiles
+
+
+def split_date_window(
+    start_date, end_date, count_records, max_records, total=None
+):
+    """
+    Splits the date window [start_date, end_date] (both included) into
+    consecutive windows holding at most `max_records` OBIS records each, by
+    bisecting windows over the budget. A single-day window is not split
+    further, even if it is over the budget.
+    :param count_records: Function returning the number of records between
+                          two dates (both included); it must raise if the
+                          count fails, as 0 drops the window.
+    :param total: Record count of the whole window, if already known.
+    :return: List of (start date, end date, record count), in date order;
+             empty windows are left out.
+    """
+    if total is None:
+        total = count_records(start_date, end_date)
+    if not total:
+        return []
+    if total <= max_records or start_date >= end_date:
+        if total > max_records:
+            logger.warning(
+                f"{total} records on {start_date}, over the budget of"
+                f" {max_records} per window."
+            )
+        return [(start_date, end_date, total)]
+    middle = start_date + (end_date - start_date) // 2
+    return split_date_window(
+        start_date, middle, count_records, max_records
+    ) + split_date_window(
+        middle + timedelta(days=1), end_date, count_records, max_records
+    )
+
+
 def trigger_full_obis_refresh(
     geometry_wkt,
     taxonid=None,
     start_date=None,
     end_date=None,
     max_pages=None,
+    concurrency=None,
+    rate=None,
+    resume=False,
+    window_pages=None,
+    upsert=False,
 ):
     """
     Function to trigger a full or date-range refresh, fetching multiple pages dynamically.
+    Pages are fetched in parallel and transformed in a background thread,
+    then stored one at a time and in order.
+    Geometries matching more than OBIS_SHARD_THRESHOLD records are split into
+    tiles (see shard_geometry), and date ranges refreshed with a
+    `window_pages` budget into windows (see split_date_window); the parts are
+    refreshed one after the other, each tracked by its own EtlRun (a child
+    of the refresh's run). The parts are stored when the run starts: a
+    resumed run goes through its stored parts rather than splitting again.
     :param start_date: Date string (YYYY-MM-DD) for filtering. If None, no start date filter applied.
     :param end_date: Date string (YYYY-MM-DD) for filtering. If None, no end date filter applied.
     :param max_pages: Optional maximum number of pages to fetch for a full refresh.
                       Useful for testing or if full refresh is too large.
+    :param concurrency: Number of pages fetched in parallel
+                        (default: OBIS_FETCH_CONCURRENCY).
+    :param rate: Maximum OBIS API requests per second, shared by all fetching
+                 threads (default: OBIS_API_RATE_LIMIT, 0 for no limit).
+    :param resume: Continue the latest incomplete run with the same
+                   parameters from its checkpoint (skipping its completed
+                   tiles or windows), if there is one.
+    :param window_pages: With both dates set, split the date range into
+                         windows of at most this many pages of records,
+                         then refresh every window in full.
+    :param upsert: Rewrite the stored records whose content changed, instead
+                   of skipping every stored record.
     """
+    concurrency = concurrency or settings.OBIS_FETCH_CONCURRENCY
+    if concurrency > settings.OBIS_FETCH_CONCURRENCY:
+        # Keep a pooled connection per fetching thread
+        resize_pool(obis_client.session, concurrency)
+    # Be respectful to the API: a shared budget of requests per second
+    rate_limiter = TokenBucket(
+        settings.OBIS_API_RATE_LIMIT if rate is None else rate
+    )
+
     if start_date or end_date:
         refresh_type = "date-range incremental"
     else:
@@ -222,54 +697,334 @@ def trigger_full_obis_refresh(
         f" taxonid: {taxonid}, start_date: {start_date}, end_date: {end_date}"
     )
 
-    total_records = 0
-    total_pages = 0
-    # current_page = 0
-    page_size = obis_client.default_size
+    def count_records(wkt, start=start_date, end=end_date):
+        # We fetch one record to get the 'total' count from the API response
+        rate_limiter.acquire()
+        _, total = obis_client.fetch_occurrences(
+            geometry=wkt,
+            taxonid=taxonid,
+            size=1,
+            page=0,
+            start_date=start,
+            end_date=end,
+            raise_errors=True,
+        )
+        return total
 
     # First, make a call to get the total number of records
-    # We fetch one record to get the 'total' count from the API response
-    initial_records, total_records = obis_client.fetch_occurrences(
-        geometry=geometry_wkt,
-        taxonid=taxonid,
-        size=1,
-        page=0,
-        start_date=start_date,
-        end_date=end_date,
-    )
+    total_records = count_records(geometry_wkt)
+    if not total_records:
+        print("No records found for the given criteria. Exiting refresh.")
+        return
 
-    if total_records > 0:
-        total_pages = (
-            total_records + page_size - 1
-        ) // page_size  # Ceiling division
-        print(
-            f"Total records to fetch: {total_records}, estimated pages:"
-            f" {total_pages}"
+    run = None
+    if resume:
+        run = EtlRun.resumable(geometry_wkt, taxonid, start_date, end_date)
+        if run is None:
+            print(
+                "No incomplete run matches these parameters; starting a new"
+                " run."
+            )
+    resumed = run is not None
+    if run:
+        print(f"Resuming ETL run {run.pk}.")
+        run.status = EtlRun.STATUS_RUNNING
+        run.error = None
+        run.upsert = upsert
+        run.save(update_fields=["status", "error", "upsert"])
+        run.tiles.update(upsert=upsert)
+    else:
+        run = EtlRun.objects.create(
+            geometry=geometry_wkt,
+            taxonid=taxonid,
+            start_date=start_date,
+            end_date=end_date,
+            upsert=upsert,
+        )
+
+    def refresh(run, total_records, max_pages):
+        return refresh_run_pages(
+            run,
+            total_records,
+            taxonid=taxonid,
+            start_date=run.start_date and str(run.start_date),
+            end_date=run.end_date and str(run.end_date),
+            max_pages=max_pages,
+            concurrency=concurrency,
+            rate_limiter=rate_limiter,
+        )
+
+    def create_parts(parts):
+        # All the parts are tracked up front, so that a resumed refresh goes
+        # through the same ones even if the OBIS counts changed since
+        parts = list(parts)
+        created = EtlRun.objects.bulk_create(
+            EtlRun(
+                parent=run,
+                geometry=part_wkt,
+                taxonid=taxonid,
+                start_date=part_start,
+                end_date=part_end,
+                upsert=upsert,
+            )
+            for part_wkt, part_start, part_end, _ in parts
         )
+        return [
+            (part_run, part_total)
+            for part_run, (*_, part_total) in zip(created, parts)
+        ]
+
+    part_runs = list(run.tiles.order_by("pk")) if resumed else []
+    # A failed count raises (rather than dropping a tile or window as
+    # empty) and fails the run
+    try:
+        if part_runs:
+            # The parts stored when the run started; their record counts are
+            # fetched again as they are reached
+            parts = [(part_run, None) for part_run in part_runs]
+            if any(
+                part_run.geometry != run.geometry for part_run in part_runs
+            ):
+                kind = "tiles"
+            else:
+                kind = "date windows"
+        elif resumed and run.last_page is not None:
+            # Started as a single run: carry on from its checkpoint
+            parts = None
+        elif window_pages and start_date and end_date:
+            # Windows of at most `window_pages` pages of records, so that
+            # each one is cheap to fetch and none is truncated
+            windows = split_date_window(
+                date.fromisoformat(str(start_date)),
+                date.fromisoformat(str(end_date)),
+                lambda start, end: count_records(
+                    geometry_wkt, start.isoformat(), end.isoformat()
+                ),
+                window_pages * obis_client.default_size,
+                total=total_records,
+            )
+            parts = create_parts(
+                (geometry_wkt, start, end, total)
+                for start, end, total in windows
+            )
+            kind = "date windows"
+        elif total_records > settings.OBIS_SHARD_THRESHOLD:
+            tiles = shard_geometry(
+                geometry_wkt,
+                count_records,
+                settings.OBIS_SHARD_THRESHOLD,
+                total=total_records,
+            )
+            parts = create_parts(
+                (tile_wkt, start_date, end_date, total)
+                for tile_wkt, total in tiles
+            )
+            kind = "tiles"
+        else:
+            parts = None
+    except Exception as e:
+        mark_run_failed(run, e)
+        raise
+
+    if parts is None:
+        refresh(run, total_records, max_pages)
     else:
-        print("No records found for the given criteria. Exiting refresh.")
-        return
+        print(
+            f"Total records: {total_records}, split into {len(parts)} {kind}."
+        )
+        pages_left = max_pages
+        # Whether every part was refreshed to its last page
+        complete = True
+        try:
+            for part_num, (part_run, part_total) in enumerate(parts):
+                if pages_left is not None and pages_left <= 0:
+                    complete = False
+                    break
+                if part_run.status == EtlRun.STATUS_COMPLETED:
+                    continue
+                if part_total is None:
+                    part_total = count_records(
+                        part_run.geometry,
+                        part_run.start_date and str(part_run.start_date),
+                        part_run.end_date and str(part_run.end_date),
+                    )
+                print(f"Processing part {part_num + 1} of {len(parts)}...")
+                pages = refresh(part_run, part_total, pages_left)
+                if part_run.status != EtlRun.STATUS_COMPLETED:
+                    complete = False
+                if pages_left is not None:
+                    pages_left -= pages
+        except Exception as e:
+            mark_run_failed(run, e)
+            raise
+        totals = run.tiles.aggregate(
+            records_processed=Sum("records_processed"),
+            new_records=Sum("new_records"),
+            updated_records=Sum("updated_records"),
+        )
+        totals = {name: total or 0 for name, total in totals.items()}
+        if complete:
+            finish_run(run, **totals)
+        else:
+            # Left running, so that --resume continues with the parts left
+            for name, total in totals.items():
+                setattr(run, name, total)
+            run.save(update_fields=list(totals))
+            print(
+                f"Stopped before the last of the {kind}; run {run.pk} can be"
+                " continued with --resume."
+            )
+    obis_refresh_finished.send(sender=EtlRun, run=run)
+
+    print(
+        f"Finished {refresh_type} OBIS refresh tasks. Total records processed:"
+        f" {total_records}."
+    )
+
+
+def mark_run_failed(run, error):
+    """Flags a run as failed; its committed pages stay checkpointed."""
+    run.status = EtlRun.STATUS_FAILED
+    run.error = str(error)
+    run.save(update_fields=["status", "error"])
+
+
+def finish_run(run, **fields):
+    """Flags a run as completed, updating the given fields as well."""
+    run.status = EtlRun.STATUS_COMPLETED
+    run.finished_at = timezone.now()
+    for name, value in fields.items():
+        setattr(run, name, value)
+    run.save(update_fields=["status", "finished_at", *fields])
+
+
+def refresh_run_pages(
+    run,
+    total_records,
+    taxonid=None,
+    start_date=None,
+    end_date=None,
+    max_pages=None,
+    concurrency=1,
+    rate_limiter=None,
+):
+    """
+    Fetches, transforms and stores the pages of the geometry of `run`, from
+    its checkpoint on, then flags it completed (or failed). A run stopped
+    by `max_pages` before its last page stays running, so that it can be
+    resumed.
+    :param total_records: Number of records matching the run's parameters.
+    :param rate_limiter: TokenBucket shared by the OBIS requests (default:
+                         no limit).
+    :return: Number of pages processed.
+    """
+    if rate_limiter is None:
+        rate_limiter = TokenBucket(0)
+    geometry_wkt = run.geometry
+    page_size = obis_client.default_size
+    total_pages = (
+        total_records + page_size - 1
+    ) // page_size  # Ceiling division
+    print(
+        f"Total records to fetch: {total_records}, estimated pages:"
+        f" {total_pages}"
+    )
+    first_page = 0 if run.last_page is None else run.last_page + 1
+    if first_page:
+        print(f"Continuing from page {first_page + 1}.")
+    if run.status != EtlRun.STATUS_RUNNING:
+        run.status = EtlRun.STATUS_RUNNING
+        run.error = None
+        run.save(update_fields=["status", "error"])
 
-    # If max_pages is specified, limit the total_pages
-    if max_pages is not None and max_pages < total_pages:
+    # If max_pages is specified, limit the pages fetched by this call
+    end_page = total_pages
+    if max_pages is not None and first_page + max_pages < total_pages:
         print(
             f"Limiting refresh to {max_pages} pages (out of"
             f" {total_pages} total pages)."
         )
-        total_pages = max_pages
+        end_page = first_page + max_pages
 
-    for page_num in range(total_pages):
-        print(f"Processing page {page_num + 1} of {total_pages}...")
-        fetch_and_store_obis_data(
-            geometry_wkt,
-            taxonid,
-            page_num,
+    def fetch_page(page_num):
+        rate_limiter.acquire()
+        obis_records, _ = obis_client.fetch_occurrences(
+            geometry=geometry_wkt,
+            taxonid=taxonid,
+            page=page_num,
             start_date=start_date,
             end_date=end_date,
+            raise_errors=True,
         )
-        time.sleep(1)  # Be respectful to the API, add a delay
+        return obis_records
 
-    print(
-        f"Finished {refresh_type} OBIS refresh tasks. Total records processed:"
-        f" {total_records}."
+    def fetch_page_after(after):
+        rate_limiter.acquire()
+        obis_records, _ = obis_client.fetch_occurrences(
+            geometry=geometry_wkt,
+            taxonid=taxonid,
+            start_date=start_date,
+            end_date=end_date,
+            after=after,
+            raise_errors=True,
+        )
+        return obis_records
+
+    # Fetch, transform and load overlap: while page N is written to the DB,
+    # page N+1 is transformed (WoRMS lookups) and the following pages are
+    # fetched. Bounded queues between the stages apply backpressure.
+    if total_records > settings.OBIS_OFFSET_PAGING_LIMIT:
+        # Deep offsets are slow and capped by OBIS: walk the result set with
+        # the `after` cursor instead. Each page depends on the previous one,
+        # so pages are fetched one at a time, ahead of the transform stage.
+        print("Using cursor pagination.")
+        fetched_pages = prefetch(
+            fetch_by_cursor(
+                fetch_page_after, end_page, first_page, run.cursor
+            ),
+            concurrency,
+        )
+    else:
+        fetched_pages = fetch_in_order(
+            fetch_page, range(first_page, end_page), concurrency
+        )
+    transformed_pages = (
+        (
+            page_num,
+            obis_records[-1].get("id") if obis_records else None,
+            len(obis_records),
+            transform_obis_page(obis_records, run.upsert),
+        )
+        for page_num, obis_records in fetched_pages
     )
+
+    pages = 0
+    # An empty page means the cursor ran out of records
+    exhausted = False
+    try:
+        for page_num, cursor, records_processed, observations in prefetch(
+            transformed_pages, settings.OBIS_PIPELINE_QUEUE_SIZE
+        ):
+            print(f"Processing page {page_num + 1} of {total_pages}...")
+            pages += 1
+            exhausted = not records_processed
+            if records_processed:
+                load_obis_page(
+                    observations,
+                    records_processed,
+                    page_num,
+                    run,
+                    cursor,
+                    upsert=run.upsert,
+                )
+    except Exception as e:
+        mark_run_failed(run, e)
+        raise
+    if end_page == total_pages or exhausted:
+        finish_run(run)
+    else:
+        print(
+            f"Stopped after page {end_page} of {total_pages}; run"
+            f" {run.pk} can be continued with --resume."
+        )
+    return pages
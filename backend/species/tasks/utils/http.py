@@ -0,0 +1,53 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Transient statuses worth retrying: rate limited, or server/gateway errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def build_session(pool_size=10, retries=3, backoff_factor=0.5, backoff_max=60):
+    """
+    requests.Session keeping up to `pool_size` keep-alive connections per
+    host, which retries failed GETs (connection errors and RETRY_STATUSES)
+    up to `retries` times.
+    Retries wait backoff_factor * 2 ** (retry - 1) seconds, plus up to
+    backoff_factor of random jitter, capped at backoff_max; a Retry-After
+    header sent with a 429/503 takes precedence.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_factor,
+        backoff_max=backoff_max,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        # Hand the last response back; callers use raise_for_status()
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def resize_pool(session, pool_size):
+    """
+    Makes a build_session() session keep up to `pool_size` connections per
+    host (e.g. for more concurrent requests than it was built for), by
+    mounting fresh adapters with the same retry policy. Connections of the
+    replaced adapters are not reused.
+    """
+    for prefix, adapter in list(session.adapters.items()):
+        session.mount(
+            prefix,
+            HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=adapter.max_retries,
+            ),
+        )
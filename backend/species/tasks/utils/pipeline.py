@@ -0,0 +1,60 @@
+import queue
+import threading
+
+from django.db import connection
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+def prefetch(iterable, size):
+    """
+    Iterates `iterable` in a background thread, at most `size` items ahead
+    of the consumer: the producer blocks while the queue is full, so memory
+    stays bounded. Exceptions raised by the producer are re-raised in the
+    consumer; if the consumer stops early, the producer is stopped too.
+    """
+    buffer = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_DONE)
+        except Exception as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(iterable, "close", None)
+            if close:
+                close()
+            # The producer may have queried the DB on its own connection
+            connection.close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
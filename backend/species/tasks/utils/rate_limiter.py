@@ -0,0 +1,40 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter: on average `rate` calls to
+    acquire() go through per second, with bursts of up to `capacity`.
+    A rate of 0 or None disables the limit.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self):
+        """Takes a token if one is available, else returns the wait time."""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Blocks until a token is available, then takes it."""
+        if not self.rate:
+            return
+        wait = self._try_acquire()
+        while wait:
+            time.sleep(wait)
+            wait = self._try_acquire()
@@ -2,13 +2,23 @@ import json
 
 import requests
 
+from .utils.http import build_session
+
 
 class WoRMSAPIClient:
     def __init__(
-        self, base_url="https://www.marinespecies.org/rest/", logger=None
+        self,
+        base_url="https://www.marinespecies.org/rest/",
+        logger=None,
+        session=None,
     ):
+        """
+        :param session: requests.Session to use; defaults to a pooled session
+                        with retries (see build_session).
+        """
         self.base_url = base_url
         self.logger = logger or self._get_default_logger()
+        self.session = session or build_session()
 
     def _get_default_logger(self):
         import logging
@@ -16,6 +26,46 @@ class WoRMSAPIClient:
         logging.basicConfig(level=logging.INFO)
         return logging.getLogger(__name__)
 
+    def fetch_common_name(self, aphia_id):
+        """
+        Fetches the English common name of an AphiaID from WoRMS.
+        :param aphia_id: The AphiaID (integer)
+        :return: Preferred common name (string), or None if WoRMS has none
+        :raises: requests.exceptions.RequestException or
+                 json.JSONDecodeError if the lookup failed.
+        """
+        endpoint = f"{self.base_url}AphiaVernacularsByAphiaID/{aphia_id}"
+        self.logger.debug(f"Fetching WoRMS common name from {endpoint}")
+        response = self.session.get(endpoint, timeout=10)
+        response.raise_for_status()
+        # WoRMS answers 204 No Content when there are no vernaculars
+        data = response.json() if response.content else None
+        if data:
+            # Only return English common names
+            english_names = [
+                d.get("vernacular")
+                for d in data
+                if d.get("language") == "English" and d.get("vernacular")
+            ]
+            if english_names:
+                # Prioritize preferred English name, otherwise take the first available English name
+                preferred_english = next(
+                    (
+                        d.get("vernacular")
+                        for d in data
+                        if d.get("language") == "English"
+                        and d.get("isPreferredName") == 1
+                        and d.get("vernacular")
+                    ),
+                    None,
+                )
+                return (
+                    preferred_english
+                    if preferred_english
+                    else english_names[0]
+                )
+        return None
+
     def get_common_name_by_aphia_id(self, aphia_id):
         """
         Fetches common names for a given AphiaID from WoRMS.
@@ -25,37 +75,8 @@ class WoRMSAPIClient:
         if not aphia_id:
             return None
 
-        endpoint = f"{self.base_url}AphiaVernacularsByAphiaID/{aphia_id}"
-        self.logger.debug(f"Fetching WoRMS common name from {endpoint}")
         try:
-            response = requests.get(endpoint, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            if data:
-                # Only return English common names
-                english_names = [
-                    d.get("vernacular")
-                    for d in data
-                    if d.get("language") == "English" and d.get("vernacular")
-                ]
-                if english_names:
-                    # Prioritize preferred English name, otherwise take the first available English name
-                    preferred_english = next(
-                        (
-                            d.get("vernacular")
-                            for d in data
-                            if d.get("language") == "English"
-                            and d.get("isPreferredName") == 1
-                            and d.get("vernacular")
-                        ),
-                        None,
-                    )
-                    return (
-                        preferred_english
-                        if preferred_english
-                        else english_names[0]
-                    )
-            return None
+            return self.fetch_common_name(aphia_id)
         except requests.exceptions.RequestException as e:
             self.logger.warning(
                 f"WoRMS API request failed for AphiaID {aphia_id}: {e}"
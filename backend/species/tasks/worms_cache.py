@@ -0,0 +1,169 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from species.models import WormsCommonName
+
+logger = logging.getLogger(__name__)
+
+
+class ResolvedCommonNames(dict):
+    """
+    Common names resolved by CachedWoRMSClient.resolve_many, keyed by
+    AphiaID. Drop-in replacement for WoRMSAPIClient in
+    get_harmonized_common_name that never queries WoRMS: ids left out (e.g.
+    failed lookups) have no name.
+    """
+
+    def get_common_name_by_aphia_id(self, aphia_id):
+        return self.get(int(aphia_id)) if aphia_id else None
+
+
+class CachedWoRMSClient:
+    """
+    WoRMS common name lookups through a two-level cache: an in-process LRU,
+    backed by the WormsCommonName table. Both levels keep an entry for
+    WORMS_CACHE_TTL_DAYS, including "no English name" answers; failed
+    lookups are not cached.
+    Drop-in replacement for WoRMSAPIClient in get_harmonized_common_name.
+    With no `client`, only cached names are used: WoRMS is never queried.
+    """
+
+    def __init__(self, client, max_size=None, ttl=None):
+        self.client = client
+        self.max_size = max_size or settings.WORMS_CACHE_SIZE
+        self.ttl = ttl or timedelta(days=settings.WORMS_CACHE_TTL_DAYS)
+        # aphia_id -> (common name or None, fetched_at)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_cached(self, aphia_id, now):
+        with self._lock:
+            entry = self._entries.get(aphia_id)
+            if entry and now - entry[1] < self.ttl:
+                self._entries.move_to_end(aphia_id)
+                return entry
+        row = (
+            WormsCommonName.objects.filter(
+                aphia_id=aphia_id, fetched_at__gt=now - self.ttl
+            )
+            .values_list("common_name", "fetched_at")
+            .first()
+        )
+        if row:
+            self._remember(aphia_id, *row)
+        return row
+
+    def _remember(self, aphia_id, common_name, fetched_at):
+        with self._lock:
+            self._entries[aphia_id] = (common_name, fetched_at)
+            self._entries.move_to_end(aphia_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _fetch(self, aphia_id):
+        """
+        Looks up an AphiaID on WoRMS.
+        :return: Tuple (success flag, common name or None)
+        """
+        if self.client is None:
+            return False, None
+        try:
+            return True, self.client.fetch_common_name(aphia_id)
+        except (
+            requests.exceptions.RequestException,
+            json.JSONDecodeError,
+        ) as e:
+            logger.warning(
+                f"WoRMS API request failed for AphiaID {aphia_id}: {e}"
+            )
+            return False, None
+
+    def get_common_name_by_aphia_id(self, aphia_id):
+        """
+        Cached WoRMSAPIClient.get_common_name_by_aphia_id.
+        :return: Preferred English common name (string) or None
+        """
+        if not aphia_id:
+            return None
+        aphia_id = int(aphia_id)
+        now = timezone.now()
+        cached = self._get_cached(aphia_id, now)
+        if cached:
+            return cached[0]
+
+        success, common_name = self._fetch(aphia_id)
+        if success:
+            WormsCommonName.objects.update_or_create(
+                aphia_id=aphia_id,
+                defaults={"common_name": common_name, "fetched_at": now},
+            )
+            self._remember(aphia_id, common_name, now)
+        return common_name
+
+    def resolve_many(self, aphia_ids, max_workers=None):
+        """
+        Warms the cache for a batch of AphiaIDs (e.g. those of an ETL page):
+        the distinct ids missing from the LRU are looked up in the DB with a
+        single query, and the remaining ones are fetched from WoRMS
+        concurrently, on up to `max_workers` threads
+        (default: WORMS_LOOKUP_CONCURRENCY), then stored in one query.
+        Each id is looked up at most once: build the batch's names from the
+        result rather than with get_common_name_by_aphia_id, which would
+        fetch the failed ids again, one by one.
+        :return: ResolvedCommonNames, aphia_id -> common name (or None) for
+                 the resolved ids; failed lookups are left out.
+        """
+        now = timezone.now()
+        aphia_ids = {int(aphia_id) for aphia_id in aphia_ids if aphia_id}
+        resolved = ResolvedCommonNames()
+        with self._lock:
+            for aphia_id in aphia_ids:
+                entry = self._entries.get(aphia_id)
+                if entry and now - entry[1] < self.ttl:
+                    self._entries.move_to_end(aphia_id)
+                    resolved[aphia_id] = entry[0]
+        missing = aphia_ids - resolved.keys()
+        if not missing:
+            return resolved
+
+        rows = WormsCommonName.objects.filter(
+            aphia_id__in=missing, fetched_at__gt=now - self.ttl
+        ).values_list("aphia_id", "common_name", "fetched_at")
+        for aphia_id, common_name, fetched_at in rows:
+            self._remember(aphia_id, common_name, fetched_at)
+            resolved[aphia_id] = common_name
+        missing = sorted(missing - resolved.keys())
+        if not missing or self.client is None:
+            return resolved
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers or settings.WORMS_LOOKUP_CONCURRENCY
+        ) as executor:
+            results = dict(zip(missing, executor.map(self._fetch, missing)))
+        fetched = []
+        for aphia_id, (success, common_name) in results.items():
+            if success:
+                fetched.append(
+                    WormsCommonName(
+                        aphia_id=aphia_id,
+                        common_name=common_name,
+                        fetched_at=now,
+                    )
+                )
+                self._remember(aphia_id, common_name, now)
+                resolved[aphia_id] = common_name
+        WormsCommonName.objects.bulk_create(
+            fetched,
+            update_conflicts=True,
+            unique_fields=["aphia_id"],
+            update_fields=["common_name", "fetched_at"],
+        )
+        return resolved
@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from species.tasks.obis_api import OBISAPIClient
+from species.tasks.utils.http import build_session, resize_pool
+from species.tasks.worms_api import WoRMSAPIClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Replies with the server's scripted (status, headers, body) in order."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.client_address))
+        status, headers, body = self.server.responses.pop(0)
+        body = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.responses = []
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def obis_client(server, retries=3):
+    return OBISAPIClient(
+        base_url=server.url,
+        session=build_session(retries=retries, backoff_factor=0),
+    )
+
+
+OBIS_PAGE = {"total": 1, "results": [{"id": "a"}]}
+
+
+def test_transient_errors_are_retried(stub_server):
+    stub_server.responses = [
+        (503, {}, {}),
+        (502, {}, {}),
+        (200, {}, OBIS_PAGE),
+    ]
+    records, total = obis_client(stub_server).fetch_occurrences("POLYGON")
+    assert (records, total) == ([{"id": "a"}], 1)
+    assert len(stub_server.requests) == 3
+
+
+def test_retry_after_is_respected(stub_server):
+    stub_server.responses = [
+        (429, {"Retry-After": "1"}, {}),
+        (200, {}, OBIS_PAGE),
+    ]
+    started = time.monotonic()
+    records, _ = obis_client(stub_server).fetch_occurrences("POLYGON")
+    assert records == [{"id": "a"}]
+    assert time.monotonic() - started >= 1
+
+
+def test_gives_up_after_max_retries(stub_server):
+    stub_server.responses = [(500, {}, {})] * 3
+    assert obis_client(stub_server, retries=2).fetch_occurrences(
+        "POLYGON"
+    ) == ([], 0)
+    assert len(stub_server.requests) == 3
+
+
+def test_client_errors_are_not_retried(stub_server):
+    stub_server.responses = [(404, {}, {})]
+    worms = WoRMSAPIClient(
+        base_url=stub_server.url, session=build_session(backoff_factor=0)
+    )
+    with pytest.raises(requests.exceptions.HTTPError):
+        worms.fetch_common_name(1)
+    assert len(stub_server.requests) == 1
+
+
+def test_connections_are_kept_alive(stub_server):
+    stub_server.responses = [
+        (200, {}, [{"vernacular": "Great white shark", "language": "English"}])
+    ] * 3
+    worms = WoRMSAPIClient(base_url=stub_server.url)
+    for _ in range(3):
+        assert worms.get_common_name_by_aphia_id(105838) == "Great white shark"
+    paths = {path for path, _ in stub_server.requests}
+    client_ports = {address[1] for _, address in stub_server.requests}
+    assert paths == {"/AphiaVernacularsByAphiaID/105838"}
+    assert len(client_ports) == 1
+
+
+def test_backoff_grows_exponentially_with_jitter():
+    retry = (
+        build_session(backoff_factor=0.5)
+        .get_adapter("https://api.obis.org")
+        .max_retries
+    )
+    assert retry.status_forcelist == (429, 500, 502, 503, 504)
+    assert retry.backoff_jitter == 0.5
+    retry = retry.increment(method="GET", url="/").increment(
+        method="GET", url="/"
+    )
+    assert 1 <= retry.get_backoff_time() <= 1.5
+
+
+def test_resize_pool_keeps_retry_policy():
+    session = build_session(pool_size=2, retries=5)
+    retry = session.get_adapter("https://api.obis.org").max_retries
+    resize_pool(session, 16)
+    for url in ("http://api.obis.org", "https://api.obis.org"):
+        adapter = session.get_adapter(url)
+        assert adapter.poolmanager.connection_pool_kw["maxsize"] == 16
+        assert adapter.max_retries is retry
@@ -0,0 +1,117 @@
+import csv
+import gzip
+import json
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from species.models import CuratedObservation, EtlRun, WormsCommonName
+from species.tasks import obis_etl
+from species.tasks.obis_dump import detect_dump_format, load_obis_dump
+from species.testing import obis_record
+
+pytestmark = pytest.mark.django_db
+
+
+def write_ndjson(path, records):
+    with gzip.open(path, "wt") as dump:
+        for record in records:
+            dump.write(json.dumps(record) + "\n")
+    return path
+
+
+def write_csv(path, records):
+    with open(path, "w", newline="") as dump:
+        writer = csv.DictWriter(dump, fieldnames=list(records[0]))
+        writer.writeheader()
+        writer.writerows(records)
+    return path
+
+
+def test_detect_dump_format():
+    assert detect_dump_format("occurrence.ndjson.gz") == "ndjson"
+    assert detect_dump_format("occurrence.CSV") == "csv"
+    assert detect_dump_format("occurrence.parquet") == "parquet"
+    assert detect_dump_format("occurrence.json") is None
+    assert detect_dump_format("occurrence.txt") is None
+
+
+def test_command_loads_ndjson_in_batches(tmp_path):
+    path = write_ndjson(
+        tmp_path / "occurrence.ndjson.gz",
+        [obis_record(f"id-{i}") for i in range(5)]
+        + [
+            obis_record("id-0"),
+            obis_record("no-coords", decimalLatitude=None),
+        ],
+    )
+    call_command("load_obis_dump", str(path), "--batch-size", "2")
+
+    assert CuratedObservation.objects.count() == 5
+    run = EtlRun.objects.get()
+    assert run.status == EtlRun.STATUS_COMPLETED
+    assert (run.records_processed, run.new_records) == (7, 5)
+    assert run.last_page == 3
+
+
+def test_csv_records_match_api_records(tmp_path):
+    records = [obis_record("a", depth=12), obis_record("b")]
+    load_obis_dump(write_csv(tmp_path / "occurrence.csv", records))
+
+    obs = CuratedObservation.objects.get(obis_id="a")
+    assert (obs.location.x, obs.location.y) == (18.4, -34.1)
+    assert (obs.depth_min, obs.depth_max) == (12, 12)
+    assert obs.common_name == "Great White Shark"
+
+    # Same curated content as the API (typed) records: nothing is rewritten
+    run = load_obis_dump(
+        write_ndjson(tmp_path / "occurrence.ndjson.gz", records), upsert=True
+    )
+    assert (run.new_records, run.updated_records) == (0, 0)
+
+
+# The records are transformed in a background thread, on its own database
+# connection: it only sees committed data
+@pytest.mark.django_db(transaction=True)
+def test_command_uses_cached_common_names_only(tmp_path):
+    WormsCommonName.objects.create(
+        aphia_id=105838, common_name="great white", fetched_at=timezone.now()
+    )
+    path = write_ndjson(
+        tmp_path / "occurrence.ndjson.gz",
+        [
+            obis_record("a", vernacularName=None, aphiaID=105838),
+            obis_record("b", vernacularName=None, aphiaID=7),
+        ],
+    )
+    with mock.patch.object(
+        obis_etl.worms_client.client, "fetch_common_name"
+    ) as fetch_common_name:
+        call_command("load_obis_dump", str(path))
+
+    fetch_common_name.assert_not_called()
+    assert dict(
+        CuratedObservation.objects.values_list("obis_id", "common_name")
+    ) == {"a": "Great White", "b": None}
+
+
+def test_command_loads_parquet(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "occurrence.parquet"
+    pq.write_table(
+        pa.Table.from_pylist([obis_record("a"), obis_record("b")]), path
+    )
+    call_command("load_obis_dump", str(path))
+    assert CuratedObservation.objects.count() == 2
+
+
+def test_command_rejects_unknown_formats(tmp_path):
+    path = tmp_path / "occurrence.txt"
+    path.write_text("")
+    with pytest.raises(CommandError):
+        call_command("load_obis_dump", str(path))
+    assert not EtlRun.objects.exists()
@@ -0,0 +1,740 @@
+import time
+from datetime import date
+from unittest import mock
+
+import pytest
+import requests
+from django.contrib.gis.geos import GEOSGeometry, Point
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from species.models import CuratedObservation, EtlRun, WormsCommonName
+from species.tasks import obis_etl
+from species.tasks.utils.pipeline import prefetch
+from species.tasks.utils.rate_limiter import TokenBucket
+from species.tasks.worms_cache import CachedWoRMSClient
+from species.testing import obis_record
+
+pytestmark = pytest.mark.django_db
+
+
+def store_page(records, **kwargs):
+    with mock.patch.object(
+        obis_etl.obis_client,
+        "fetch_occurrences",
+        return_value=(records, len(records)),
+    ):
+        return obis_etl.fetch_and_store_obis_data("POLYGON EMPTY", **kwargs)
+
+
+def test_store_page_builds_curated_observations():
+    result = store_page([
+        obis_record("a"),
+        obis_record("b", decimalLongitude=None),
+        obis_record(None),
+    ])
+    assert result["records_processed"] == 3
+    assert result["new_records"] == 1
+
+    obs = CuratedObservation.objects.get()
+    assert obs.obis_id == "a"
+    assert obs.common_name == "Great White Shark"
+    assert obs.machine_observation == "Human Observation"
+    assert (obs.location.x, obs.location.y) == (18.4, -34.1)
+    assert obs.notes == "Imported from OBIS dataset: Shark survey"
+
+
+def test_store_page_bulk_inserts_in_batches(settings):
+    settings.OBIS_BULK_BATCH_SIZE = 10
+    records = [obis_record(f"id-{i}") for i in range(25)]
+    with CaptureQueriesContext(connection) as queries:
+        result = store_page(records)
+    inserts = [
+        query
+        for query in queries.captured_queries
+        if query["sql"].startswith("INSERT")
+        and CuratedObservation._meta.db_table in query["sql"]
+    ]
+    assert len(inserts) == 3
+    assert result["new_records"] == 25
+    assert CuratedObservation.objects.count() == 25
+
+
+def test_store_page_skips_existing_and_repeated_records():
+    store_page([obis_record("a")])
+    run = EtlRun.objects.create()
+    result = store_page(
+        [obis_record("a"), obis_record("b"), obis_record("b")], run=run
+    )
+    assert result["new_records"] == 1
+    assert sorted(
+        CuratedObservation.objects.values_list("obis_id", flat=True)
+    ) == ["a", "b"]
+    run.refresh_from_db()
+    assert (run.records_processed, run.new_records) == (3, 1)
+
+
+def test_store_page_only_looks_up_page_ids():
+    CuratedObservation.objects.bulk_create(
+        CuratedObservation(obis_id=f"old-{i}", species_name="Old")
+        for i in range(20)
+    )
+    with CaptureQueriesContext(connection) as queries:
+        result = store_page([obis_record("old-1"), obis_record("new")])
+    lookup = next(
+        query["sql"]
+        for query in queries.captured_queries
+        if query["sql"].startswith(
+            'SELECT "species_curatedobservation"."obis_id"'
+        )
+    )
+    assert " IN (" in lookup
+    assert result["new_records"] == 1
+
+
+def test_records_stored_concurrently_are_not_counted_as_new():
+    store_page([obis_record("a")])
+    observations = obis_etl.transform_obis_page(
+        [obis_record("a"), obis_record("b")], upsert=True
+    )
+    run = EtlRun.objects.create()
+    # "a" was stored by another refresh after the page's ids were checked
+    with mock.patch.object(
+        obis_etl, "find_existing_obis_ids", return_value=set()
+    ):
+        new_records = obis_etl.load_obis_page(observations, 2, run=run)
+    assert new_records == 1
+    run.refresh_from_db()
+    assert run.new_records == 1
+    assert CuratedObservation.objects.count() == 2
+
+
+def test_failed_common_name_lookup_is_not_repeated_per_record():
+    records = [
+        obis_record(f"id-{i}", vernacularName=None, aphiaID=105838)
+        for i in range(3)
+    ]
+    worms = mock.Mock(
+        **{"fetch_common_name.side_effect": requests.ConnectionError}
+    )
+    observations = obis_etl.transform_obis_page(
+        records, worms=CachedWoRMSClient(worms)
+    )
+    worms.fetch_common_name.assert_called_once_with(105838)
+    assert [obs.common_name for obs in observations] == [None] * 3
+
+
+def test_token_bucket_limits_rate():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+    assert bucket._try_acquire() == 0
+    assert bucket._try_acquire() == 0
+    assert bucket._try_acquire() == pytest.approx(0.5)
+    now[0] = 0.5
+    assert bucket._try_acquire() == 0
+
+
+def test_fetch_in_order_yields_pages_in_order():
+    def fetch(page):
+        time.sleep(0.01 * (5 - page))
+        return page * 10
+
+    assert list(obis_etl.fetch_in_order(fetch, range(6), concurrency=3)) == [
+        (page, page * 10) for page in range(6)
+    ]
+
+
+def test_full_refresh_fetches_pages_concurrently():
+    def fetch_occurrences(size=None, page=0, **kwargs):
+        if size == 1:
+            return [], 5
+        return [
+            obis_record(f"id-{i}")
+            for i in range(page * 2, min(page * 2 + 2, 5))
+        ], 5
+
+    with (
+        mock.patch.object(obis_etl.obis_client, "default_size", 2),
+        mock.patch.object(
+            obis_etl.obis_client,
+            "fetch_occurrences",
+            side_effect=fetch_occurrences,
+        ),
+    ):
+        obis_etl.trigger_full_obis_refresh(
+            "POLYGON EMPTY", concurrency=3, rate=0
+        )
+
+    assert CuratedObservation.objects.count() == 5
+    run = EtlRun.objects.get()
+    assert run.finished_at is not None
+    assert (run.records_processed, run.new_records) == (5, 5)
+
+
+def test_prefetch_applies_backpressure():
+    produced = []
+
+    def items():
+        for i in range(10):
+            produced.append(i)
+            yield i
+
+    consumed = prefetch(items(), size=2)
+    assert next(consumed) == 0
+    time.sleep(0.2)
+    # One item consumed, two queued and one blocked on the full queue
+    assert len(produced) <= 4
+    assert list(consumed) == list(range(1, 10))
+
+
+def test_prefetch_reraises_producer_errors():
+    def items():
+        yield 1
+        raise ValueError("broken page")
+
+    consumed = prefetch(items(), size=2)
+    assert next(consumed) == 1
+    with pytest.raises(ValueError, match="broken page"):
+        next(consumed)
+
+
+def test_full_refresh_uses_cursor_above_offset_limit(settings):
+    settings.OBIS_OFFSET_PAGING_LIMIT = 4
+    ids = [f"id-{i}" for i in range(5)]
+    calls = []
+
+    def fetch_occurrences(size=None, page=0, after=None, **kwargs):
+        if size == 1:
+            return [], len(ids)
+        calls.append((page, after))
+        start = ids.index(after) + 1 if after else 0
+        page_ids = [i for i in ids if ids.index(i) >= start][:2]
+        return [obis_record(i) for i in page_ids], len(ids)
+
+    with (
+        mock.patch.object(obis_etl.obis_client, "default_size", 2),
+        mock.patch.object(
+            obis_etl.obis_client,
+            "fetch_occurrences",
+            side_effect=fetch_occurrences,
+        ),
+    ):
+        obis_etl.trigger_full_obis_refresh("POLYGON EMPTY", rate=0)
+
+    assert calls == [(0, None), (0, "id-1"), (0, "id-3")]
+    assert CuratedObservation.objects.count() == 5
+
+
+def test_failed_refresh_can_be_resumed():
+    ids = [f"id-{i}" for i in range(5)]
+    calls = []
+    failing_pages = {2}
+
+    def fetch_occurrences(size=None, page=0, **kwargs):
+        if size == 1:
+            return [], len(ids)
+        calls.append(page)
+        if page in failing_pages:
+            failing_pages.discard(page)
+            raise RuntimeError("OBIS is down")
+        page_ids = [i for n, i in enumerate(ids) if n // 2 == page]
+        return [obis_record(i) for i in page_ids], len(ids)
+
+    with (
+        mock.patch.object(obis_etl.obis_client, "default_size", 2),
+        mock.patch.object(
+            obis_etl.obis_client,
+            "fetch_occurrences",
+            side_effect=fetch_occurrences,
+        ),
+    ):
+        with pytest.raises(RuntimeError):
+            obis_etl.trigger_full_obis_refresh(
+                "POLYGON EMPTY", concurrency=1, rate=0
+            )
+        run = EtlRun.objects.get()
+        assert run.status == EtlRun.STATUS_FAILED
+        assert (run.last_page, run.cursor) == (1, "id-3")
+
+        calls.clear()
+        obis_etl.trigger_full_obis_refresh(
+            "POLYGON EMPTY", concurrency=1, rate=0, resume=True
+        )
+
+    assert calls == [2]
+    run = EtlRun.objects.get()
+    assert run.status == EtlRun.STATUS_COMPLETED
+    assert (run.records_processed, run.new_records) == (5, 5)
+    assert CuratedObservation.objects.count() == 5
+
+
+def obis_session(ids, failing):
+    """
+    Fake requests session serving the OBIS records `ids` by offset or
+    `after` cursor; requests for the pages starting at an id in `failing`
+    fail (once) with a connection error.
+    """
+
+    def get(url, params=None, timeout=None):
+        if params["size"] == 1:
+            data = {"total": len(ids), "results": []}
+        else:
+            after = params.get("after")
+            start = ids.index(after) + 1 if after else params["offset"]
+            if start < len(ids) and ids[start] in failing:
+                failing.discard(ids[start])
+                raise requests.exceptions.ConnectionError("OBIS is down")
+            data = {
+                "total": len(ids),
+                "results": [
+                    obis_record(i)
+                    for n, i in enumerate(ids)
+                    if start <= n < start + params["size"]
+                ],
+            }
+        return mock.Mock(
+            raise_for_status=mock.Mock(), json=mock.Mock(return_value=data)
+        )
+
+    return mock.Mock(get=mock.Mock(side_effect=get))
+
+
+@pytest.mark.parametrize("offset_paging_limit", [10000, 4])
+def test_failed_page_request_fails_the_run(settings, offset_paging_limit):
+    """
+    A page the API client could not fetch fails the run instead of being
+    skipped (or ending a cursor walk), so that --resume fetches it again.
+    """
+    settings.OBIS_OFFSET_PAGING_LIMIT = offset_paging_limit
+    ids = [f"id-{i}" for i in range(5)]
+    session = obis_session(ids, failing={"id-2"})
+    with (
+        mock.patch.object(obis_etl.obis_client, "default_size", 2),
+        mock.patch.object(obis_etl.obis_client, "session", session),
+    ):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            obis_etl.trigger_full_obis_refresh(
+                "POLYGON EMPTY", concurrency=1, rate=0
+            )
+        run = EtlRun.objects.get()
+        assert run.status == EtlRun.STATUS_FAILED
+        assert run.last_page == 0
+
+        obis_etl.trigger_full_obis_refresh(
+            "POLYGON EMPTY", concurrency=1, rate=0, resume=True
+        )
+
+    run = EtlRun.objects.get()
+    assert run.status == EtlRun.STATUS_COMPLETED
+    assert CuratedObservation.objects.count() == 5
+
+
+def test_refresh_run_pages_defaults_to_no_rate_limit():
+    run = EtlRun.objects.create(geometry="POLYGON EMPTY")
+    with mock.patch.object(
+        obis_etl.obis_client,
+        "fetch_occurrences",
+        return_value=([obis_record("a")], 1),
+    ):
+        assert obis_etl.refresh_run_pages(run, 1) == 1
+    assert run.status == EtlRun.STATUS_COMPLETED
+    assert CuratedObservation.objects.count() == 1
+
+
+def test_refresh_stopped_by_max_pages_can_be_resumed():
+    ids = [f"id-{i}" for i in range(5)]
+    session = obis_session(ids, failing=set())
+    with (
+        mock.patch.object(obis_etl.obis_client, "default_size", 2),
+        mock.patch.object(obis_etl.obis_client, "session", session),
+    ):
+        obis_etl.trigger_full_obis_refresh(
+            "POLYGON EMPTY", max_pages=1, rate=0
+        )
+        run = EtlRun.objects.get()
+        assert run.status == EtlRun.STATUS_RUNNING
+        assert run.last_page == 0
+        assert CuratedObservation.objects.count() == 2
+
+        obis_etl.trigger_full_obis_refresh(
+            "POLYGON EMPTY", rate=0, resume=True
+        )
+
+    run = EtlRun.objects.get()
+    assert run.status == EtlRun.STATUS_COMPLETED
+    assert (run.records_processed, run.new_records) == (5, 5)
+
+
+def test_resume_ignores_runs_with_other_parameters():
+    EtlRun.objects.create(geometry="POLYGON EMPTY", last_page=3)
+    EtlRun.objects.create(
+        geometry="POLYGON EMPTY", last_page=5, status=EtlRun.STATUS_COMPLETED
+    )
+    assert EtlRun.resumable("POLYGON EMPTY", None, None, None).last_page == 3
+    assert EtlRun.resumable("POLYGON EMPTY", "1234", None, None) is None
+    assert (
+        EtlRun.resumable("POLYGON EMPTY", None, "2025-01-01", "2025-02-01")
+        is None
+    )
+
+
+def test_incremental_resume_reuses_the_interrupted_window():
+    run = EtlRun.objects.create(
+        geometry="POLYGON EMPTY",
+        start_date=date(2025, 1, 1),
+        end_date=date(2025, 1, 31),
+        last_page=2,
+    )
+    with mock.patch(
+        "species.management.commands.refresh_obis_data"
+        ".trigger_full_obis_refresh"
+    ) as trigger:
+        call_command(
+            "refresh_obis_data", "--geometry", "POLYGON EMPTY", "--resume"
+        )
+    assert trigger.call_args.args[2:4] == ("2025-01-01", "2025-01-31")
+    assert (
+        EtlRun.resumable("POLYGON EMPTY", None, *trigger.call_args.args[2:4])
+        == run
+    )
+
+
+def points_counter(points, calls=None):
+    """count_records stand-in: number of points covered by a WKT geometry."""
+
+    def count_records(wkt):
+        if calls is not None:
+            calls.append(wkt)
+        geometry = GEOSGeometry(wkt)
+        return sum(geometry.covers(Point(*point)) for point in points)
+
+    return count_records
+
+
+def test_shard_geometry_splits_dense_areas(settings):
+    settings.OBIS_SHARD_MIN_SIZE = 1
+    points = [(10, 10), (20, 20), (-100, 40), (-101, 41), (-102, 42)]
+    tiles = obis_etl.shard_geometry(
+        "POLYGON((-180 -90, 180 -90, 180 90, -180 90, -180 -90))",
+        points_counter(points),
+        threshold=2,
+    )
+    assert sum(total for _, total in tiles) == len(points)
+    assert all(total <= 2 for _, total in tiles)
+    # Empty quadrants are left out
+    assert all(total > 0 for _, total in tiles)
+
+
+def test_shard_geometry_stops_at_min_size(settings):
+    settings.OBIS_SHARD_MIN_SIZE = 5
+    tiles = obis_etl.shard_geometry(
+        "POLYGON((0 0, 16 0, 16 16, 0 16, 0 0))",
+        points_counter([(1, 1)] * 5),
+        threshold=2,
+    )
+    assert [total for _, total in tiles] == [5]
+    assert GEOSGeometry(tiles[0][0]).extent == (0, 0, 8, 8)
+
+
+def test_sharded_refresh_tracks_one_run_per_tile(settings):
+    settings.OBIS_SHARD_THRESHOLD = 2
+    settings.OBIS_SHARD_MIN_SIZE = 1
+    points = {"a": (10, 10), "b": (20, 20), "c": (-100, 40), "d": (-50, 40)}
+
+    def fetch_occurrences(geometry, size=None, page=0, **kwargs):
+        tile = GEOSGeometry(geometry)
+        records = [
+            obis_record(
+                obis_id, decimalLongitude=point[0], decimalLatitude=point[1]
+            )
+            for obis_id, point in points.items()
+            if tile.covers(Point(*point))
+        ]
+        return records[:size], len(records)
+
+    with mock.patch.object(
+        obis_etl.obis_client,
+        "fetch_occurrences",
+        side_effect=fetch_occurrences,
+    ):
+        obis_etl.trigger_full_obis_refresh(
+            "POLYGON((-180 -90, 180 -90, 180 90, -180 90, -180 -90))", rate=0
+        )
+
+    assert CuratedObservation.objects.count() == 4
+    run = EtlRun.objects.get(parent=None)
+    assert run.status == EtlRun.STATUS_COMPLETED
+    assert run.tiles.count() == 2
+    assert not run.tiles.exclude(status=EtlRun.STATUS_COMPLETED).exists()
+    assert (run.records_processed, run.new_records) == (4, 4)
+
+
+def test_failed_tile_count_fails_the_refresh(settings):
+    settings.OBIS_SHARD_THRESHOLD = 2
+    settings.OBIS_SHARD_MIN_SIZE = 1
+    responses = [
+        mock.Mock(json=mock.Mock(return_value={"total": 4, "results": []}))
+    ]
+
+    def get(url, params=None, timeout=None):
+        if responses:
+            return responses.pop()
+        raise requests.exceptions.ConnectionError("OBIS is down")
+
+    session = mock.Mock(get=mock.Mock(side_effect=get))
+    with mock.patch.object(obis_etl.obis_client, "session", session):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            obis_etl.trigger_full_obis_refresh(
+                "POLYGON((-180 -90, 180 -90, 180 90, -180 90, -180 -90))",
+                rate=0,
+            )
+    run = EtlRun.objects.get()
+    assert run.status == EtlRun.STATUS_FAILED
+    assert not CuratedObservation.objects.exists()
+
+
+def test_sharded_refresh_stopped_by_max_pages_stays_resumable(settings):
+    settings.OBIS_SHARD_THRESHOLD = 2
+    settings.OBIS_SHARD_MIN_SIZE = 1
+    points = {"a": (10, 10), "b": (20, 20), "c": (-100, 40), "d": (-50, 40)}
+
+    def fetch_occurrences(geometry, size=None, page=0, **kwargs):
+        tile = GEOSGeometry(geometry)
+        records = [
+            obis_record(
+                obis_id, decimalLongitude=point[0], decimalLatitude=point[1]
+            )
+            for obis_id, point in points.items()
+            if tile.covers(Point(*point))
+        ]
+        page_records = [r for n, r in enumerate(records) if n == page]
+        return (records if size == 1 else page_records), len(records)
+
+    world = "POLYGON((-180 -90, 180 -90, 180 90, -180 90, -180 -90))"
+    with (
+        mock.patch.object(obis_etl.obis_client, "default_size", 1),
+        mock.patch.object(
+            obis_etl.obis_client,
+            "fetch_occurrences",
+            side_effect=fetch_occurrences,
+        ),
+    ):
+        obis_etl.trigger_full_obis_refresh(world, max_pages=1, rate=0)
+        run = EtlRun.objects.get(parent=None)
+        assert run.status == EtlRun.STATUS_RUNNING
+        # Every tile is tracked from the start
+        tiles = set(run.tiles.values_list("geometry", flat=True))
+        assert len(tiles) == 2
+        assert not run.tiles.filter(status=EtlRun.STATUS_COMPLETED).exists()
+        assert CuratedObservation.objects.count() == 1
+
+        # A new record would now split its tile: the stored tiles are kept
+        points["e"] = (15, 15)
+        obis_etl.trigger_full_obis_refresh(world, rate=0, resume=True)
+
+    run = EtlRun.objects.get(parent=None)
+    assert run.status == EtlRun.STATUS_COMPLETED
+    assert set(run.tiles.values_list("geometry", flat=True)) == tiles
+    assert CuratedObservation.objects.count() == 5
+    assert (run.records_processed, run.new_records) == (5, 5)
+
+
+def dates_counter(days):
+    def count_records(start, end):
+        return sum(start <= day <= end for day in days)
+
+    return count_records
+
+
+def test_split_date_window_bisects_until_windows_fit():
+    days = [date(2025, 1, 2)] * 3 + [date(2025, 1, 20), date(2025, 1, 31)]
+    windows = obis_etl.split_date_window(
+        date(2025, 1, 1), date(2025, 1, 31), dates_counter(days), 2
+    )
+    assert windows == [
+        # A single day over the budget is kept whole
+        (date(2025, 1, 2), date(2025, 1, 2), 3),
+        (date(2025, 1, 17), date(2025, 1, 31), 2),
+    ]
+
+
+def test_failed_window_count_fails_the_refresh():
+    counts = [
+        {"total": 5, "results": []},  # Whole range
+        {"total": 3, "results": []},  # First half
+    ]
+
+    def get(url, params=None, timeout=None):
+        if counts:
+            return mock.Mock(json=mock.Mock(return_value=counts.pop(0)))
+        raise requests.exceptions.ConnectionError("OBIS is down")
+
+    session = mock.Mock(get=mock.Mock(side_effect=get))
+    with (
+        mock.patch.object(obis_etl.obis_client, "default_size", 2),
+        mock.patch.object(obis_etl.obis_client, "session", session),
+    ):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            obis_etl.trigger_full_obis_refresh(
+                "POLYGON EMPTY",
+                start_date="2025-01-01",
+                end_date="2025-01-31",
+                rate=0,
+                window_pages=1,
+            )
+    run = EtlRun.objects.get()
+    assert run.status == EtlRun.STATUS_FAILED
+    assert not run.tiles.exists()
+
+
+def test_windowed_refresh_ingests_every_window():
+    days = {
+        f"id-{i}": f"2025-01-{day:02d}"
+        for i, day in enumerate([1, 3, 5, 5, 9, 12, 20])
+    }
+
+    def fetch_occurrences(size=None, page=0, start_date=None, **kwargs):
+        end_date = kwargs["end_date"]
+        matching = [
+            obis_id
+            for obis_id, day in days.items()
+            if start_date <= day <= end_date
+        ]
+        if size == 1:
+            return [], len(matching)
+        page_ids = [i for n, i in enumerate(matching) if n // 2 == page]
+        return [
+            obis_record(obis_id, eventDate=days[obis_id])
+            for obis_id in page_ids
+        ], len(matching)
+
+    with (
+        mock.patch.object(obis_etl.obis_client, "default_size", 2),
+        mock.patch.object(
+            obis_etl.obis_client,
+            "fetch_occurrences",
+            side_effect=fetch_occurrences,
+        ),
+    ):
+        obis_etl.trigger_full_obis_refresh(
+            "POLYGON EMPTY",
+            start_date="2025-01-01",
+            end_date="2025-01-31",
+            rate=0,
+            window_pages=1,
+        )
+
+    # A single page of the whole range would have stored 2 of the 7 records
+    assert CuratedObservation.objects.count() == 7
+    run = EtlRun.objects.get(parent=None)
+    assert run.status == EtlRun.STATUS_COMPLETED
+    assert (run.records_processed, run.new_records) == (7, 7)
+    windows = run.tiles.order_by("start_date")
+    assert all(window.records_processed <= 2 for window in windows)
+    assert not windows.exclude(status=EtlRun.STATUS_COMPLETED).exists()
+
+
+def test_content_hash_ignores_raw_data_only_changes():
+    observation = obis_etl.build_curated_observation(obis_record("a"))
+    assert len(observation.content_hash) == 64
+    assert (
+        obis_etl.build_curated_observation(
+            obis_record("a", modified="2025-01-01")
+        ).content_hash
+        == observation.content_hash
+    )
+    assert (
+        obis_etl.build_curated_observation(
+            obis_record("a", decimalLatitude=-34.2)
+        ).content_hash
+        != observation.content_hash
+    )
+
+
+def row_versions():
+    """obis_id -> xmin, the id of the transaction that last wrote the row."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT obis_id, xmin::text FROM"
+            f" {CuratedObservation._meta.db_table}"
+        )
+        return dict(cursor.fetchall())
+
+
+def test_upsert_rewrites_only_changed_records():
+    store_page([obis_record("a"), obis_record("b"), obis_record("c")])
+
+    # Without upsert, stored records are skipped even if they changed
+    store_page([obis_record("b", eventDate="2021-03-04")])
+    assert CuratedObservation.objects.get(
+        obis_id="b"
+    ).observation_date == date(2020, 1, 2)
+
+    versions = row_versions()
+    run = EtlRun.objects.create(geometry="POLYGON EMPTY", upsert=True)
+    new_records = obis_etl.store_obis_page(
+        [
+            obis_record("a"),
+            obis_record("b", eventDate="2021-03-04"),
+            # Changes outside of the curated fields are ignored
+            obis_record("c", modified="2025-01-01"),
+            obis_record("d"),
+        ],
+        run=run,
+        upsert=True,
+    )
+    assert new_records == 1
+    run.refresh_from_db()
+    assert (run.records_processed, run.new_records, run.updated_records) == (
+        4,
+        1,
+        1,
+    )
+    assert run.data_changed_at is not None
+
+    assert CuratedObservation.objects.count() == 4
+    assert CuratedObservation.objects.get(
+        obis_id="b"
+    ).observation_date == date(2021, 3, 4)
+    new_versions = row_versions()
+    assert new_versions["a"] == versions["a"]
+    assert new_versions["c"] == versions["c"]
+    assert new_versions["b"] != versions["b"]
+
+
+def upsert_page(records, worms):
+    run = EtlRun.objects.create(geometry="POLYGON EMPTY", upsert=True)
+    obis_etl.load_obis_page(
+        obis_etl.transform_obis_page(records, upsert=True, worms=worms),
+        len(records),
+        run=run,
+        upsert=True,
+    )
+
+
+def test_upsert_keeps_common_name_when_lookup_fails():
+    record = obis_record("a", vernacularName=None, aphiaID=105838)
+    worms = mock.Mock(**{"fetch_common_name.return_value": "great white"})
+    upsert_page([record], CachedWoRMSClient(worms))
+    assert CuratedObservation.objects.get().common_name == "Great White"
+    versions = row_versions()
+
+    # The cached name expired, and WoRMS is now unreachable
+    WormsCommonName.objects.all().delete()
+    worms = mock.Mock(
+        **{"fetch_common_name.side_effect": requests.ConnectionError}
+    )
+    unreachable_worms = CachedWoRMSClient(worms)
+
+    # A failed WoRMS lookup is not a change of the record
+    upsert_page([record], unreachable_worms)
+    worms.fetch_common_name.assert_called_once_with(105838)
+    assert row_versions()["a"] == versions["a"]
+
+    # Records rewritten for other changes keep their stored common name
+    upsert_page([dict(record, eventDate="2021-03-04")], unreachable_worms)
+    assert worms.fetch_common_name.call_count == 2
+    obs = CuratedObservation.objects.get(obis_id="a")
+    assert obs.observation_date == date(2021, 3, 4)
+    assert obs.common_name == "Great White"
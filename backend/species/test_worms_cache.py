@@ -0,0 +1,122 @@
+import time
+from datetime import timedelta
+
+import pytest
+import requests
+from django.utils import timezone
+
+from species.models import WormsCommonName
+from species.tasks.worms_cache import CachedWoRMSClient
+
+pytestmark = pytest.mark.django_db
+
+
+class FakeWoRMSClient:
+    def __init__(self, names):
+        self.names = names
+        self.calls = []
+
+    def fetch_common_name(self, aphia_id):
+        self.calls.append(aphia_id)
+        name = self.names[aphia_id]
+        if isinstance(name, Exception):
+            raise name
+        return name
+
+
+def test_lookups_are_cached_in_process_and_in_db():
+    worms = FakeWoRMSClient({105838: "Great White Shark", 1: None})
+    client = CachedWoRMSClient(worms)
+    for _ in range(3):
+        assert (
+            client.get_common_name_by_aphia_id(105838) == "Great White Shark"
+        )
+        # "No English name" is cached too
+        assert client.get_common_name_by_aphia_id("1") is None
+    assert worms.calls == [105838, 1]
+
+    # A new process starts with an empty LRU but finds the DB entries
+    client = CachedWoRMSClient(worms)
+    assert client.get_common_name_by_aphia_id(105838) == "Great White Shark"
+    assert client.get_common_name_by_aphia_id(1) is None
+    assert worms.calls == [105838, 1]
+    assert WormsCommonName.objects.count() == 2
+
+
+def test_expired_entries_are_fetched_again(settings):
+    settings.WORMS_CACHE_TTL_DAYS = 30
+    WormsCommonName.objects.create(
+        aphia_id=105838,
+        common_name="Old name",
+        fetched_at=timezone.now() - timedelta(days=31),
+    )
+    worms = FakeWoRMSClient({105838: "Great White Shark"})
+    client = CachedWoRMSClient(worms)
+    assert client.get_common_name_by_aphia_id(105838) == "Great White Shark"
+    assert worms.calls == [105838]
+    assert WormsCommonName.objects.get().common_name == "Great White Shark"
+
+
+def test_failed_lookups_are_not_cached():
+    worms = FakeWoRMSClient({7: requests.exceptions.ConnectionError()})
+    client = CachedWoRMSClient(worms)
+    assert client.get_common_name_by_aphia_id(7) is None
+    assert client.get_common_name_by_aphia_id(7) is None
+    assert worms.calls == [7, 7]
+    assert not WormsCommonName.objects.exists()
+
+
+def test_lru_evicts_least_recently_used():
+    worms = FakeWoRMSClient({1: "One", 2: "Two", 3: "Three"})
+    client = CachedWoRMSClient(worms, max_size=2)
+    for aphia_id in (1, 2, 1, 3):
+        client.get_common_name_by_aphia_id(aphia_id)
+    assert list(client._entries) == [1, 3]
+
+
+def test_resolve_many_batches_uncached_ids():
+    worms = FakeWoRMSClient({
+        1: "One",
+        2: None,
+        3: requests.exceptions.HTTPError("503"),
+        4: "Four",
+    })
+    client = CachedWoRMSClient(worms)
+    client.get_common_name_by_aphia_id(1)
+    WormsCommonName.objects.create(
+        aphia_id=4, common_name="Four", fetched_at=timezone.now()
+    )
+
+    resolved = client.resolve_many([1, 2, 2, "3", 4, None], max_workers=4)
+    assert resolved == {1: "One", 2: None, 4: "Four"}
+    # 1 came from the LRU and 4 from the DB; 2 and 3 were fetched once each
+    assert sorted(worms.calls) == [1, 2, 3]
+    assert set(WormsCommonName.objects.values_list("aphia_id", flat=True)) == {
+        1,
+        2,
+        4,
+    }
+    assert client.get_common_name_by_aphia_id(2) is None
+    assert sorted(worms.calls) == [1, 2, 3]
+
+
+def test_resolve_many_runs_lookups_concurrently():
+    class SlowWoRMSClient:
+        def fetch_common_name(self, aphia_id):
+            time.sleep(0.2)
+            return f"Name {aphia_id}"
+
+    client = CachedWoRMSClient(SlowWoRMSClient())
+    started = time.monotonic()
+    resolved = client.resolve_many(range(1, 9), max_workers=8)
+    assert len(resolved) == 8
+    assert time.monotonic() - started < 1
+
+
+def test_resolved_names_do_not_fetch_failed_ids_again():
+    worms = FakeWoRMSClient({1: "One", 7: requests.exceptions.Timeout()})
+    names = CachedWoRMSClient(worms).resolve_many([1, 7])
+    for _ in range(3):
+        assert names.get_common_name_by_aphia_id("1") == "One"
+        assert names.get_common_name_by_aphia_id(7) is None
+    assert sorted(worms.calls) == [1, 7]
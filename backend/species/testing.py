@@ -0,0 +1,17 @@
+"""Helpers shared by the species tests."""
+
+
+def obis_record(obis_id, **extra):
+    """OBIS API occurrence record; `extra` fields override the defaults."""
+    record = {
+        "id": obis_id,
+        "scientificName": "Carcharodon carcharias",
+        "vernacularName": "great white shark",
+        "decimalLongitude": 18.4,
+        "decimalLatitude": -34.1,
+        "eventDate": "2020-01-02",
+        "basisOfRecord": "HumanObservation",
+        "datasetName": "Shark survey",
+    }
+    record.update(extra)
+    return record